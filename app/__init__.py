@@ -1,14 +1,19 @@
-import logging, os, uuid
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+import argparse, logging, os, uuid
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, make_response
 from dotenv import load_dotenv
-from sqlalchemy import select, func
-from .models import SessionLocal, Player, PropUniverse, AdvanceBet, WinBet, PropBet, User
-from .api import api as fastapi_app
-from .odds import pool_odds, prop_odds
-from .payouts import calculate_all_payouts, get_payout_summary
+from sqlalchemy import select
+from .models import SessionLocal, Player, PropUniverse, User
+from .api import api as fastapi_app, bind_flask_sessions, ledger_headers
+from .ledger import ledger, MARKETS
+from . import pages
+from .positions import portfolio
+from .writer import bet_writer
+from .history import snapshotter
+from .snapshot import reads
+from .passwords import passwords, HashBusy
+from .settlement import settle, stream_payouts, export_lines, EXPORT_FORMATS
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from werkzeug.serving import run_simple
-from werkzeug.security import generate_password_hash, check_password_hash
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
@@ -17,6 +22,13 @@ def create_app():
 
     app = Flask(__name__)
     app.secret_key = os.getenv("FLASK_SECRET", "dev")
+    bind_flask_sessions(app)        # /api/me/* reads this app's session cookie
+
+    # pool aggregates live in memory from here on; see app/ledger.py
+    with SessionLocal() as db:
+        ledger.load(db)
+    bet_writer.recover()            # journals left by a crashed worker; see app/journal.py
+    snapshotter.start()             # odds history; see app/history.py
 
     # Authentication decorator
     def login_required(f):
@@ -28,6 +40,29 @@ def create_app():
         decorated_function.__name__ = f.__name__
         return decorated_function
 
+    def render_market(name, market, template, build_model):
+        """Render a cached market page model; 304 if the client's copy is current."""
+        page_version = pages.version(market)
+        tag = pages.etag(name, page_version, session.get("user_email", ""))
+        # pending flashes are shown (and consumed) by the page, so always send it then
+        if "_flashes" not in session and request.if_none_match.contains_weak(tag):
+            resp = Response(status=304)
+        else:
+            resp = make_response(render_template(template, **build_model(page_version)))
+        resp.set_etag(tag, weak=True)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        # rosters are read fresh and cached under the current roster version,
+        # so the page is as stale as the ledger its odds come from
+        resp.headers.update(ledger_headers())
+        return resp
+
+    def busy(template, exc):
+        """503 for a login / sign-up shed by the password pool."""
+        flash("Too many sign-ins right now, please try again in a moment", "error")
+        resp = make_response(render_template(template), 503)
+        resp.headers["Retry-After"] = str(exc.retry_after)
+        return resp
+
     @app.route("/login", methods=["GET", "POST"])
     def login():
         if request.method == "POST":
@@ -40,15 +75,20 @@ def create_app():
             
             with SessionLocal() as db:
                 user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-                
-                if user and check_password_hash(user.password_hash, password):
-                    session['user_email'] = user.email
-                    session['user_id'] = user.id
-                    flash("Login successful!", "success")
-                    return redirect(url_for('index'))
-                else:
-                    flash("Invalid email or password", "error")
-                    return render_template("login.html")
+
+            try:
+                ok = user is not None and passwords.verify(user.password_hash, password)
+            except HashBusy as exc:
+                return busy("login.html", exc)
+
+            if ok:
+                session['user_email'] = user.email
+                session['user_id'] = user.id
+                flash("Login successful!", "success")
+                return redirect(url_for('index'))
+            else:
+                flash("Invalid email or password", "error")
+                return render_template("login.html")
         
         return render_template("login.html")
 
@@ -76,8 +116,14 @@ def create_app():
                 if existing_user:
                     flash("User with this email already exists", "error")
                     return render_template("register.html")
-                
-                password_hash = generate_password_hash(password)
+
+            # hash outside the session so no connection is held while waiting on the pool
+            try:
+                password_hash = passwords.hash(password)
+            except HashBusy as exc:
+                return busy("register.html", exc)
+
+            with SessionLocal() as db:
                 new_user = User(email=email, password_hash=password_hash)
                 db.add(new_user)
                 db.commit()
@@ -95,12 +141,8 @@ def create_app():
 
     @app.route("/")
     def index():
-        with SessionLocal() as db:
-            total = (
-                (db.scalar(select(func.sum(AdvanceBet.amount))) or 0) +
-                (db.scalar(select(func.sum(WinBet.amount)))     or 0) +
-                (db.scalar(select(func.sum(PropBet.amount)))    or 0)
-            )
+        # in memory, and correct whether or not pool_totals is installed
+        total = sum(ledger.pool_total(m) for m in MARKETS)
 
         buttons = [
             {"href": url_for("advance"), "title": "Advance",
@@ -115,40 +157,7 @@ def create_app():
     @app.route("/advance")
     @login_required
     def advance():
-        with SessionLocal() as db:
-            runners = (
-                db.execute(
-                    select(Player)
-                    .order_by(Player.division, Player.heat, Player.player_name)
-                )
-                .scalars()
-                .all()
-            )
-
-            # --- nest by division → heat ----------------------------------
-            divisions = {}
-            for p in runners:
-                d = divisions.setdefault(p.division, {})
-                d.setdefault(p.heat, []).append(p)
-
-            odds = pool_odds(db, AdvanceBet, AdvanceBet.player_id)
-
-            div_totals = {d: sum(odds.get(pl.id, {}).get("stake", 0)
-                     for heats in h.values() for pl in heats)
-              for d, h in divisions.items()}
-            heat_totals = { (d,h): sum(odds.get(pl.id, {}).get("stake", 0)
-                                    for pl in players)
-                            for d, heats in divisions.items()
-                            for h, players in heats.items()}
-
-            total_pool = db.scalar(select(func.sum(AdvanceBet.amount))) or 0.0
-
-        return render_template("advance.html",
-                            divisions=divisions,
-                            odds=odds,
-                            pool_total=total_pool,
-                            div_totals=div_totals,
-                            heat_totals=heat_totals)
+        return render_market("advance", "advance", "advance.html", pages.advance_model)
     
 
     @app.route("/bet", methods=["POST"])
@@ -161,82 +170,60 @@ def create_app():
         
         market = request.form["market"]
         target = request.form["target_id"]
-        amt = float(request.form["amount"])
 
-        with SessionLocal() as db:
-            if market == "advance":
-                db.add(AdvanceBet(player_id=target, amount=amt, bettor_email=email))
-            elif market == "win":
-                db.add(WinBet(player_id=target, amount=amt, bettor_email=email))
-            elif market == "prop":
-                side_yes = request.form.get("side_yes") == "true"
-                db.add(PropBet(prop_id=target, amount=amt, side_yes=side_yes, bettor_email=email))
-            db.commit()
+        side_yes = request.form.get("side_yes") == "true" if market == "prop" else None
+        try:
+            amt = float(request.form["amount"])
+            bet_writer.place(market, target, amt, email, side_yes)
+        except ValueError as exc:         # bad amount, or see app.writer.bet_errors()
+            flash(str(exc), "error")
+            return redirect(request.referrer or url_for("index"))
         flash(f"Bet placed: {email} → {market} ${amt}")
         return redirect(request.referrer or url_for("index"))
     
     @app.route("/win")
     @login_required
     def win():
-        with SessionLocal() as db:
-            players = (
-                db.execute(
-                    select(Player)
-                    .where(Player.active == True)
-                    .order_by(Player.division, Player.player_name)
-                )
-                .scalars()
-                .all()
-            )
-
-            # nest players by division
-            divisions = {}
-            for p in players:
-                divisions.setdefault(p.division, []).append(p)
-
-            odds = pool_odds(db, WinBet, WinBet.player_id)
-
-            # total $ per division
-            div_totals = {d: sum(odds.get(pl.id, {}).get("stake", 0)
-                                for pl in plist)
-                        for d, plist in divisions.items()}
-
-        return render_template("win.html",
-                            divisions=divisions,
-                            odds=odds,
-                            div_totals=div_totals)
+        return render_market("win", "win", "win.html", pages.win_model)
 
     @app.route("/props")
     @login_required
     def props():
-        with SessionLocal() as db:
-            props = db.execute(select(PropUniverse)
-                            .where(PropUniverse.active==True)).scalars().all()
-            odds = prop_odds(db)
-            pool_total = db.scalar(select(func.sum(PropBet.amount))) or 0.0
-        return render_template("props.html", props=props,
-                            odds=odds, pool_total=pool_total)
+        return render_market("props", "prop", "props.html", pages.props_model)
 
     @app.route("/rules")
     def rules():
         return render_template("rules.html")
 
+    def results_from_form():
+        # This would be where you input the actual results
+        # For now, this is a placeholder for the payout calculation interface
+        return {
+            'advance_winners': request.form.getlist('advance_winners'),
+            'win_winner': request.form.get('win_winner'),
+            'prop_results': {}  # Would parse from form data
+        }
+
+    @app.route("/my-bets")
+    @login_required
+    def my_bets():
+        # fresh: a user's own bets must include the one they just placed
+        with reads.session(fresh=True) as db:
+            mine = portfolio(db, session["user_email"])
+            age = reads.age(db)
+        resp = make_response(render_template("my_bets.html", portfolio=mine))
+        resp.headers.update(reads.headers(age))
+        return resp
+
     @app.route("/payouts", methods=["GET", "POST"])
     @login_required
     def payouts():
         """Calculate and display payouts based on event results."""
         if request.method == "POST":
-            # This would be where you input the actual results
-            # For now, this is a placeholder for the payout calculation interface
-            results = {
-                'advance_winners': request.form.getlist('advance_winners'),
-                'win_winner': request.form.get('win_winner'),
-                'prop_results': {}  # Would parse from form data
-            }
+            results = results_from_form()
             
             with SessionLocal() as db:
-                payouts = calculate_all_payouts(db, results)
-                summary = get_payout_summary(db, results)
+                payouts, summary = settle(db, results)
             
             return render_template("payouts.html", payouts=payouts, summary=summary)
         
@@ -247,16 +234,63 @@ def create_app():
         
         return render_template("payouts_form.html", players=players, props=props)
 
+    @app.route("/payouts/export", methods=["POST"])
+    @login_required
+    def payouts_export():
+        """Stream the settlement as CSV or JSON Lines, one row per winning bettor."""
+        fmt = request.form.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return Response(f"format must be one of {', '.join(EXPORT_FORMATS)}", status=400)
+        results = results_from_form()
+
+        def generate():
+            # the session lives as long as the response is streaming
+            with SessionLocal() as db:
+                yield from export_lines(stream_payouts(db, results), fmt)
+
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        return Response(generate(), mimetype=mimetype, headers={
+            "Content-Disposition": f"attachment; filename=payouts.{fmt}"})
+
     
     return app
 
 
 
 # --- run both apps behind one server -----------------------
-def main():
-    flask_app = create_app()
-    application = DispatcherMiddleware(flask_app, {"/api": fastapi_app})
-    run_simple("0.0.0.0", 8080, application, use_reloader=False)
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app")
+    parser.add_argument("--dev", action="store_true",
+                        help="single-process Werkzeug dev server instead of uvicorn")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="uvicorn worker processes (env WEB_CONCURRENCY)")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE", "15")),
+                        help="seconds to hold idle keep-alive connections")
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args(argv)
+
+    if args.dev:
+        from a2wsgi import ASGIMiddleware
+        flask_app = create_app()
+        application = DispatcherMiddleware(flask_app, {"/api": ASGIMiddleware(fastapi_app)})
+        run_simple(args.host, args.port, application, use_reloader=False, threaded=True)
+        return
+
+    import uvicorn
+    uvicorn.run(
+        "app.asgi:application",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
 
 if __name__ == "__main__":
     main()
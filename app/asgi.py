@@ -0,0 +1,43 @@
+"""
+ASGI entrypoint for production serving.
+
+Flask (wrapped with a2wsgi) and the FastAPI `/api` app share one ASGI
+stack, so uvicorn can serve both from several worker processes:
+
+    python -m app --workers 4
+    uvicorn app.asgi:application --workers 4      # equivalent
+"""
+
+import os
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from . import create_app
+from .api import api
+from .writer import bet_writer
+from .passwords import passwords
+from .history import snapshotter
+from .snapshot import reads
+
+# threads per worker for Flask views (they block on the bet writer)
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "32"))
+
+
+@asynccontextmanager
+async def lifespan(_):
+    yield
+    # uvicorn has stopped taking requests; commit whatever is still queued
+    bet_writer.close()
+    passwords.close()
+    snapshotter.close()
+    reads.close()
+
+
+application = Starlette(
+    routes=[
+        Mount("/api", app=api),
+        Mount("/", app=WSGIMiddleware(create_app(), workers=WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
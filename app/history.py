@@ -0,0 +1,162 @@
+"""
+Odds history.
+
+Every HISTORY_SECONDS an `OddsSnapshotter` thread per server process
+syncs the pool ledger and writes one odds_history row for each market /
+target / side whose stake changed since the last snapshot, stamped with
+the wall-clock time rounded down to the interval.  Quiet targets cost
+nothing, so a whole event is a few rows per active runner per interval.
+
+Rows hold the cumulative stake, not an increment, and the primary key
+includes the bucket, so every worker can snapshot independently: the
+first insert for a bucket wins and the others are ignored (ON CONFLICT
+DO NOTHING), and a missed or duplicated bucket never corrupts later
+values.
+
+`history()` reads a time range back as evenly spaced points: the stake
+of every target at each point is the last row at or before it, so
+downsampling a long event to a few hundred points is one indexed range
+scan plus a forward fill.
+"""
+
+import logging, math, os, threading, time
+from sqlalchemy import select, func, text, and_
+from .models import SessionLocal, OddsHistory, engine
+from .ledger import ledger, MARKETS
+from .odds import HOUSE
+
+INTERVAL = int(os.getenv("HISTORY_SECONDS", "60"))      # 0 disables
+MAX_POINTS = 2000
+
+log = logging.getLogger(__name__)
+
+_INSERT = text("insert into odds_history (market, target_id, side_yes, ts, stake) "
+               "values (:market, :target_id, :side_yes, :ts, :stake) on conflict do nothing")
+
+
+class OddsSnapshotter:
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self._last = None           # (market, target_id, side_yes) -> stake last written
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        if not self.interval or self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                OddsHistory.__table__.create(engine, checkfirst=True)
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="odds-history",
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # wake on the interval boundary so all workers agree on the bucket
+            now = time.time()
+            if self._stop.wait(self.interval - now % self.interval):
+                return
+            try:
+                self.snapshot(int(time.time() // self.interval * self.interval))
+            except Exception:
+                log.exception("odds history snapshot failed")
+
+    def snapshot(self, ts):
+        """Write the rows that changed since the last snapshot at bucket `ts`; return them."""
+        with SessionLocal() as db:
+            if self._last is None:
+                self._last = latest(db)
+            current = {(m, t, bool(side)): round(stake, 2)
+                       for m, stakes in ledger.snapshot().items()
+                       for (t, side), stake in stakes.items()}
+            rows = [{"market": m, "target_id": t, "side_yes": side, "ts": ts, "stake": stake}
+                    for (m, t, side), stake in current.items()
+                    if self._last.get((m, t, side)) != stake]
+            if rows:
+                db.execute(_INSERT, rows)
+                db.commit()
+        self._last.update(current)
+        return rows
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def latest(session, market=None, before=None):
+    """{(market, target_id, side_yes): stake} of the newest row per key (ts < before)."""
+    h = OddsHistory
+    newest = select(h.market, h.target_id, h.side_yes, func.max(h.ts).label("ts"))
+    if market is not None:
+        newest = newest.where(h.market == market)
+    if before is not None:
+        newest = newest.where(h.ts < before)
+    newest = newest.group_by(h.market, h.target_id, h.side_yes).subquery()
+    rows = session.execute(
+        select(h.market, h.target_id, h.side_yes, h.stake).join(newest, and_(
+            h.market == newest.c.market, h.target_id == newest.c.target_id,
+            h.side_yes == newest.c.side_yes, h.ts == newest.c.ts)))
+    return {(m, t, bool(side)): stake for m, t, side, stake in rows}
+
+
+def history(session, market, start=None, end=None, points=200):
+    """
+    Stake and implied probability per target at evenly spaced times in
+    [start, end] (unix seconds; default: the whole recorded history):
+
+        {"market", "start", "end", "step", "ts": [...],
+         "targets": {target_id: {"stake": [...], "prob": [...]}}}
+
+    Props are summed over both sides, like /api/odds/prop.  `step` is a
+    multiple of the snapshot interval, picked so there are at most
+    `points` samples.
+    """
+    if market not in MARKETS:
+        raise ValueError(f"unknown market {market!r}")
+    h = OddsHistory
+    interval = INTERVAL or 60
+    if start is None:
+        start = session.scalar(select(func.min(h.ts)).where(h.market == market))
+        if start is None:
+            return {"market": market, "start": None, "end": None, "step": interval,
+                    "ts": [], "targets": {}}
+    end = int(time.time()) if end is None else end
+    start, end = int(start), max(int(end), int(start))
+    points = max(1, min(int(points), MAX_POINTS))
+    step = max(1, math.ceil((end - start + 1) / points / interval)) * interval
+    stamps = list(range(start, end + 1, step))
+
+    # state just before the range, then every change inside it, oldest first
+    sides = {(t, side): v for (_, t, side), v in latest(session, market, before=start).items()}
+    state = {}
+    for (target, _), stake in sides.items():
+        state[target] = state.get(target, 0.0) + stake
+    changes = session.execute(
+        select(h.ts, h.target_id, h.side_yes, h.stake)
+        .where(h.market == market, h.ts >= start, h.ts <= end)
+        .order_by(h.ts)).all()
+
+    series, i = {}, 0
+    for n, at in enumerate(stamps):
+        while i < len(changes) and changes[i][0] <= at:
+            _, target, side, stake = changes[i]
+            key = (target, bool(side))
+            state[target] = state.get(target, 0.0) + stake - sides.get(key, 0.0)
+            sides[key] = stake
+            i += 1
+        total = sum(state.values()) * (1.0 - HOUSE)
+        for target, stake in state.items():
+            s = series.setdefault(target, {"stake": [0.0] * len(stamps),
+                                           "prob": [0.0] * len(stamps)})
+            s["stake"][n] = round(stake, 2)
+            s["prob"][n] = round(stake * (1.0 - HOUSE) / total, 4) if total > 0 else 0.0
+    return {"market": market, "start": start, "end": end, "step": step,
+            "ts": stamps, "targets": series}
+
+
+snapshotter = OddsSnapshotter()
@@ -0,0 +1,340 @@
+"""
+Append-only bet journal (opt-in: BET_JOURNAL_DIR).
+
+With a journal directory configured, `bet_writer` is a `JournalWriter`:
+a bet is acknowledged once it is in a fixed-size binary record in this
+process's journal file, appended and fdatasync'd per batch (same
+BET_BATCH_MS / BET_BATCH_SIZE group commit as the plain writer), so an
+acknowledged bet costs one sequential append instead of a SQLite
+transaction.  A projector thread then inserts the records into
+advance_bets / win_bets / prop_bets and applies them to the pool ledger;
+odds therefore trail acknowledgements by the projection lag (normally a
+few ms; see `lag()`).
+
+Projection is idempotent by bet_id: records whose bet_id is already in
+the DB are skipped, so replaying a journal twice, or a journal that was
+partly projected before a crash, is always safe.  While the DB is
+unavailable a batch is retried; a batch the DB rejects otherwise is
+projected record by record, and records that still fail are moved to
+quarantine-<pid>-<ns>.journal (same format, never replayed) and logged,
+so one bad record cannot freeze the odds.
+
+Each process writes its own file, bets-<pid>-<ns>.journal, and holds an
+exclusive flock on it while alive; the directory is fsync'd once the
+file is in place, so its name survives a power loss.  On start-up `recover()` replays (via
+mmap) every journal in the directory whose lock it can take, i.e. whose
+writer died, then deletes it; a clean shutdown projects everything and
+deletes its own file.  A torn record at the end of a file (crash during
+the append) was never acknowledged and is dropped.
+
+Record layout (little endian, 144 bytes):
+
+    bet_id      16s   uuid bytes
+    target_id   36s   ascii, NUL padded
+    email       64s   utf-8, NUL padded
+    amount      d
+    placed_at   q     unix ns
+    market      B     1 advance, 2 win, 3 prop
+    side        B     0 n/a, 1 yes, 2 no
+    (pad)       6x
+    crc32       I     of the preceding 140 bytes
+
+scripts/verify_journal.py compares journal files with the DB.
+"""
+
+import fcntl, logging, math, mmap, os, queue, struct, threading, time, uuid, zlib
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from .models import SessionLocal, AdvanceBet, WinBet, PropBet
+from .ledger import ledger
+from .writer import BetWriter, make_bet, MODELS, BATCH_SIZE, BATCH_MS
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BWJRNL01"
+HEADER = struct.Struct("<8sI4x")                    # magic, record size
+RECORD = struct.Struct("<16s36s64sdqBB6xI")
+MARKET_CODES = {"advance": 1, "win": 2, "prop": 3}
+MARKET_NAMES = {v: k for k, v in MARKET_CODES.items()}
+PROJECT_BATCH = 500
+
+Scan = namedtuple("Scan", "records valid_bytes size")
+
+
+# ─── records ─────────────────────────────────────────────────────
+def encode(bet, placed_ns):
+    market, target_id, amount, email, side_yes, bet_id = bet
+    side = 0 if market != "prop" else (1 if side_yes else 2)
+    body = RECORD.pack(uuid.UUID(bet_id).bytes, target_id.encode("ascii"),
+                       email.encode("utf-8"), amount, placed_ns,
+                       MARKET_CODES[market], side, 0)[:-4]
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def decode(buf, offset=0):
+    """(bet, placed_ns) from the record at `offset`, or None if its CRC is off."""
+    raw_id, target, email, amount, placed_ns, market, side, crc = \
+        RECORD.unpack_from(buf, offset)
+    if zlib.crc32(buf[offset:offset + RECORD.size - 4]) != crc or market not in MARKET_NAMES:
+        return None
+    market = MARKET_NAMES[market]
+    bet = (market, target.rstrip(b"\0").decode("ascii"), amount,
+           email.rstrip(b"\0").decode("utf-8"),
+           (side == 1) if market == "prop" else None, str(uuid.UUID(bytes=raw_id)))
+    return bet, placed_ns
+
+
+def check(market, target_id, amount, bettor_email):
+    """Raise ValueError for a bet the journal cannot hold or the DB would reject."""
+    if market not in MARKET_CODES:
+        raise ValueError(f"unknown market {market!r}")
+    if not (math.isfinite(float(amount)) and float(amount) > 0):
+        raise ValueError("amount must be positive")
+    if len(str(target_id)) > 36 or not str(target_id).isascii():
+        raise ValueError("target_id does not fit a journal record")
+    if len(bettor_email.encode("utf-8")) > 64:
+        raise ValueError("bettor_email does not fit a journal record")
+
+
+def read_journal(path):
+    """mmap `path` and decode every record up to the first torn or corrupt one."""
+    size = os.path.getsize(path)
+    if size < HEADER.size:
+        return Scan([], 0, size)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        magic, record_size = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a bet journal")
+        records, offset = [], HEADER.size
+        while offset + RECORD.size <= size:
+            rec = decode(buf, offset)
+            if rec is None:
+                break
+            records.append(rec)
+            offset += RECORD.size
+    return Scan(records, offset, size)
+
+
+# ─── projection ──────────────────────────────────────────────────
+def _placed_at(ns):
+    # the bet tables hold naive UTC, like datetime.utcnow()
+    return datetime.fromtimestamp(ns / 1e9, timezone.utc).replace(tzinfo=None)
+
+
+def project(records):
+    """
+    Insert the (bet, placed_ns) records whose bet_id is not in the DB yet
+    and apply them to the ledger; return how many were inserted.
+    """
+    by_market = {}
+    for bet, ns in records:
+        by_market.setdefault(bet[0], []).append((bet, ns))
+    inserted = []
+    with ledger.commit_lock:
+        with SessionLocal() as db:
+            for market, items in by_market.items():
+                model = MODELS[market]
+                ids = [bet[5] for bet, _ in items]
+                seen = set()
+                for i in range(0, len(ids), PROJECT_BATCH):
+                    seen.update(db.scalars(select(model.bet_id)
+                                           .where(model.bet_id.in_(ids[i:i + PROJECT_BATCH]))))
+                for bet, ns in items:
+                    if bet[5] in seen:
+                        continue
+                    seen.add(bet[5])
+                    row = make_bet(*bet[:5], bet_id=bet[5])
+                    row.placed_at = _placed_at(ns)
+                    db.add(row)
+                    inserted.append(bet)
+            db.commit()
+        for market, target_id, amount, _, side_yes, bet_id in inserted:
+            ledger.record(market, target_id, amount, side_yes, bet_id)
+    return len(inserted)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _project_retrying(records):
+    # OperationalError: DB locked or unavailable, not a problem with the records
+    delay = 0.05
+    while True:
+        try:
+            return project(records)
+        except OperationalError:
+            log.warning("projecting %d journaled bets: DB unavailable; retrying",
+                        len(records), exc_info=True)
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+# ─── writer ──────────────────────────────────────────────────────
+class JournalWriter(BetWriter):
+    def __init__(self, directory, batch_size=BATCH_SIZE, batch_ms=BATCH_MS):
+        super().__init__(batch_size, batch_ms)
+        self.directory = Path(directory)
+        self.path = None
+        self._fd = None
+        self._pending = queue.Queue()       # journaled batches awaiting projection
+        self._acked = deque()               # when each of those was acknowledged
+        self._projector = None
+
+    def check(self, bet):
+        # nothing is rejected after the ack, so validate everything the DB would
+        market, target_id, amount, bettor_email, _, _ = bet
+        check(market, target_id, amount, bettor_email)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._fd is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                name = f"bets-{os.getpid()}-{time.time_ns()}.journal"
+                # lock it under a name recover() ignores, so no other process
+                # can take it for a dead writer's journal in between
+                tmp = self.directory / f".{name}"
+                self._fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                self._write(HEADER.pack(MAGIC, RECORD.size))
+                self.path = self.directory / name
+                os.rename(tmp, self.path)
+                _fsync_dir(self.directory)      # or the rename may not survive a crash
+                self._projector = threading.Thread(target=self._project_loop,
+                                                   name="bet-projector", daemon=True)
+                self._projector.start()
+        super()._ensure_started()
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+        os.fdatasync(self._fd)
+
+    def _flush(self, batch):
+        ns = time.time_ns()
+        try:
+            self._write(b"".join(encode(bet, ns) for bet, _ in batch))
+        except Exception as exc:
+            for _, fut in batch:
+                fut.set_exception(exc)
+            return
+        self._acked.append(time.monotonic())
+        for _, fut in batch:
+            fut.set_result(None)
+        self._pending.put([(bet, ns) for bet, _ in batch])
+
+    def _project_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            records, batches = list(item), 1
+            stop = False
+            while len(records) < PROJECT_BATCH:
+                try:
+                    item = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                records.extend(item)
+                batches += 1
+            self._project(records)
+            for _ in range(batches):
+                self._acked.popleft()
+            if stop:
+                return
+
+    def _project(self, records, source=None):
+        """
+        project() `records`, retrying while the DB is unavailable (they are
+        durable in the journal).  If the batch fails otherwise, project its
+        records one by one and quarantine the ones the DB rejects, so one
+        bad record cannot stall projection.  Returns how many were inserted.
+        """
+        try:
+            return _project_retrying(records)
+        except Exception:
+            log.exception("projecting %d journaled bets failed; retrying one by one",
+                          len(records))
+        inserted = 0
+        for record in records:
+            try:
+                inserted += _project_retrying([record])
+            except Exception:
+                log.exception("quarantining journaled bet %s", record[0][5])
+                self._quarantine(record, source or self.path)
+        return inserted
+
+    def _quarantine(self, record, source):
+        """Append `record` to quarantine-<source name>, which recover() never replays."""
+        path = self.directory / f"quarantine-{source.name.removeprefix('bets-')}"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, HEADER.pack(MAGIC, RECORD.size))
+            os.write(fd, encode(*record))
+            os.fdatasync(fd)
+        finally:
+            os.close(fd)
+
+    def lag(self):
+        """Seconds the oldest acknowledged bet not yet in the ledger has waited."""
+        try:
+            return max(0.0, time.monotonic() - self._acked[0])
+        except IndexError:
+            return 0.0
+
+    def recover(self):
+        """Project and remove journals left behind by dead writers; return bets inserted."""
+        if not self.directory.is_dir():
+            return 0
+        total = 0
+        for path in sorted(self.directory.glob("bets-*.journal")):
+            if path == self.path:
+                continue
+            inserted = 0
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue                    # another worker already replayed it
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue                # its writer (or another recover()) holds it
+                if not path.exists():
+                    continue                # replayed and unlinked before we got the lock
+                scan = read_journal(path)
+                for i in range(0, len(scan.records), PROJECT_BATCH):
+                    inserted += self._project(scan.records[i:i + PROJECT_BATCH], path)
+                if scan.valid_bytes < scan.size:
+                    log.warning("%s: dropped %d bytes of torn tail (never acknowledged)",
+                                path.name, scan.size - scan.valid_bytes)
+                path.unlink(missing_ok=True)
+            log.info("replayed %s: %d records, %d new", path.name, len(scan.records), inserted)
+            total += inserted
+        return total
+
+    def close(self):
+        """Drain the queue, project every journaled bet and delete the journal."""
+        super().close()
+        if self._projector is not None:
+            self._pending.put(None)
+            self._projector.join()
+            self._projector = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self.path.unlink()
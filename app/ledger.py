@@ -0,0 +1,314 @@
+"""
+In-memory pool ledger.
+
+Keeps running stake totals per market / target so odds reads never have
+to aggregate the bet tables.  The ledger is loaded once from the
+materialized pool_totals table (O(targets)) and then bumped in O(1) by
+every bet committed through `/bet` or the API.
+
+With several server processes each one holds its own ledger, so bets
+committed elsewhere are picked up by `sync()`: at most every
+LEDGER_SYNC_SECONDS a read tails the bet tables past the last rowid it
+has seen (SQLite) or reloads the aggregates (other databases).  Writers
+commit and record() under `commit_lock` so a sync never double counts
+a bet this process is about to record itself.
+
+`age()` is how far behind the other processes a read may be: normally
+at most LEDGER_SYNC_SECONDS, more if a sync was skipped because a
+writer held commit_lock.
+
+Every market also carries a version: the number of bets applied to it,
+which only ever grows.  Two processes can hold different bets at the
+same count, though, so ETags use `tag()` instead: the highest bet rowid
+applied, taken right after a sync so it covers this process's own bets
+too.  Every process holding the same bets reports the same tag.
+
+`verify()` re-runs the SQL in app.odds and reports any drift; `rebuild()`
+reloads from the raw bet tables.
+"""
+
+import os, threading, time
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.exc import OperationalError
+from .models import SessionLocal, AdvanceBet, WinBet, PropBet, PoolTotal
+from .odds import HOUSE, pool_odds, prop_odds
+
+MARKETS = ("advance", "win", "prop")
+SYNC_SECONDS = float(os.getenv("LEDGER_SYNC_SECONDS", "1.0"))   # 0 disables
+
+ROWID = literal_column("rowid")
+_TABLES = (
+    ("advance", AdvanceBet, AdvanceBet.player_id),
+    ("win",     WinBet,     WinBet.player_id),
+    ("prop",    PropBet,    PropBet.prop_id),
+)
+
+
+class PoolLedger:
+    def __init__(self, sync_seconds=SYNC_SECONDS):
+        self._lock = threading.Lock()           # guards the aggregates
+        self.commit_lock = threading.RLock()    # held across commit + record()
+        self.sync_seconds = sync_seconds
+        self.loaded = False
+        self._last_sync = 0.0
+        self._tails = False                     # SQLite: sync() tails rowids
+        self._reset()
+
+    def _reset(self):
+        # market -> {target_id: stake}; props are keyed per prop (both sides)
+        self.stakes = {m: {} for m in MARKETS}
+        self.totals = {m: 0.0 for m in MARKETS}
+        self.versions = {m: 0 for m in MARKETS}
+        # (prop_id, side_yes) -> stake, and side_yes -> stake across all props
+        self.prop_sides = {}
+        self.side_totals = {True: 0.0, False: 0.0}
+        # highest rowid applied per market, and bets recorded since last sync
+        self.watermarks = {m: 0 for m in MARKETS}
+        self._local = set()
+        self._dirty = {m: False for m in MARKETS}   # recorded since the last sync
+
+    # ─── loading ─────────────────────────────────────────────────
+    def load(self, session):
+        """
+        Load every aggregate from the materialized pool_totals table.
+
+        Falls back to rebuild() when pool_totals is not trigger-maintained
+        (non-SQLite) or does not exist yet.
+        """
+        if session.bind.dialect.name != "sqlite":
+            return self.rebuild(session)
+        # one statement, so the totals and the rowid watermarks share a snapshot
+        marks = [select(func.max(ROWID)).select_from(model).scalar_subquery()
+                 for _, model, _ in _TABLES]
+        try:
+            rows = session.execute(
+                select(PoolTotal.market, PoolTotal.target_id, PoolTotal.side_yes,
+                       PoolTotal.n_bets, PoolTotal.stake, *marks)
+                .where(PoolTotal.n_bets > 0)
+            ).all()
+        except OperationalError:
+            session.rollback()
+            return self.rebuild(session)
+        with self.commit_lock, self._lock:
+            self._reset()
+            for market, target, side_yes, n_bets, stake, *_ in rows:
+                side = bool(side_yes) if market == "prop" else None
+                self._add(market, target, float(stake), side, n_bets)
+            if rows:
+                self.watermarks = dict(zip(MARKETS, (m or 0 for m in rows[0][-3:])))
+            self._tails = True
+            self.loaded = True
+            self._last_sync = time.monotonic()
+
+    def rebuild(self, session):
+        """(Re)build every aggregate from the raw bet tables."""
+        tail = session.bind.dialect.name == "sqlite"
+        with self.commit_lock, self._lock:
+            self._reset()
+            for market, model, field in _TABLES:
+                group = [field, model.side_yes] if market == "prop" else [field]
+                stmt = (select(*group, func.count(), func.sum(model.amount))
+                        .group_by(*group))
+                if tail:
+                    mark = session.scalar(select(func.max(ROWID)).select_from(model)) or 0
+                    self.watermarks[market] = mark
+                    stmt = stmt.where(ROWID <= mark)
+                for row in session.execute(stmt):
+                    side = bool(row[1]) if market == "prop" else None
+                    self._add(market, str(row[0]), float(row[-1]), side, row[-2])
+            self._tails = tail
+            self.loaded = True
+            self._last_sync = time.monotonic()
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with SessionLocal() as db:
+                self.load(db)
+        elif self.sync_seconds and time.monotonic() - self._last_sync > self.sync_seconds:
+            # whoever gets here first syncs; everyone else reads as-is
+            if self.commit_lock.acquire(blocking=False):
+                try:
+                    with SessionLocal() as db:
+                        self.sync(db)
+                finally:
+                    self.commit_lock.release()
+
+    def sync(self, session):
+        """Apply bets committed by other processes since the last load/sync."""
+        with self.commit_lock:
+            if session.bind.dialect.name != "sqlite":
+                return self.load(session)
+            for market, model, field in _TABLES:
+                cols = [ROWID, model.bet_id, field, model.amount]
+                if market == "prop":
+                    cols.append(model.side_yes)
+                rows = session.execute(
+                    select(*cols).where(ROWID > self.watermarks[market]).order_by(ROWID)
+                ).all()
+                with self._lock:
+                    for rowid, bet_id, target, amount, *side in rows:
+                        if bet_id not in self._local:
+                            self._add(market, str(target), float(amount),
+                                      bool(side[0]) if side else None)
+                        self.watermarks[market] = rowid
+            with self._lock:
+                self._local.clear()
+                self._dirty = {m: False for m in MARKETS}
+            self._last_sync = time.monotonic()
+
+    # ─── writes ──────────────────────────────────────────────────
+    def _add(self, market, target_id, amount, side_yes=None, n_bets=1):
+        stakes = self.stakes[market]
+        stakes[target_id] = stakes.get(target_id, 0.0) + amount
+        self.totals[market] += amount
+        self.versions[market] += n_bets
+        if market == "prop":
+            key = (target_id, bool(side_yes))
+            self.prop_sides[key] = self.prop_sides.get(key, 0.0) + amount
+            self.side_totals[bool(side_yes)] += amount
+
+    def record(self, market, target_id, amount, side_yes=None, bet_id=None):
+        """
+        Apply one committed bet.  Call only after the DB commit succeeds,
+        and while holding commit_lock if other processes write too.
+        """
+        if not self.loaded:
+            return          # the next read loads it from the DB anyway
+        with self._lock:
+            self._add(market, str(target_id), float(amount), side_yes)
+            self._dirty[market] = True
+            if bet_id is not None and self.sync_seconds:
+                self._local.add(bet_id)
+
+    # ─── reads (same shapes as app.odds) ─────────────────────────
+    def version(self, market):
+        """Pool version of `market`; bumped by every committed bet."""
+        self.ensure_loaded()
+        return self.versions[market]
+
+    def tag(self, market):
+        """
+        ETag-able identity of `market`'s pool state, the same in every
+        process holding the same bets: the highest bet rowid applied.
+        Syncs first if this process recorded bets since its last sync.
+        With syncing off (a single process) or outside SQLite it is the
+        version instead.
+        """
+        self.ensure_loaded()
+        if not (self.sync_seconds and self._tails):
+            return f"v{self.versions[market]}"
+        if self._dirty[market]:
+            with self.commit_lock, SessionLocal() as db:
+                self.sync(db)
+        return f"r{self.watermarks[market]}"
+
+    def age(self):
+        """
+        Seconds since bets committed by other processes were last synced
+        in; 0 with syncing off, where this process is the only writer.
+        """
+        if not self.sync_seconds:
+            return 0.0
+        return max(0.0, time.monotonic() - self._last_sync)
+
+    def pool_total(self, market):
+        self.ensure_loaded()
+        return self.totals[market]
+
+    def pool_odds(self, market):
+        """Ledger twin of app.odds.pool_odds for `market`."""
+        self.ensure_loaded()
+        with self._lock:
+            total = self.totals[market] * (1.0 - HOUSE)
+            odds = {}
+            if total <= 0:
+                return odds
+            for id_, stake in self.stakes[market].items():
+                prob = (stake * (1.0 - HOUSE)) / total
+                odds[id_] = {
+                    "prob": round(float(prob), 4),
+                    "stake": round(float(stake), 2),
+                }
+            return odds
+
+    def prop_odds(self):
+        """Ledger twin of app.odds.prop_odds."""
+        self.ensure_loaded()
+        with self._lock:
+            odds = {}
+            for (prop_id, side_yes), stake in self.prop_sides.items():
+                side = "yes" if side_yes else "no"
+                total = self.side_totals[side_yes] * (1 - HOUSE)
+                prob = ((stake * (1 - HOUSE)) / total) if total else 0
+                odds.setdefault(prop_id, {})[side] = {"stake": float(stake),
+                                                      "prob": round(prob, 4)}
+            return odds
+
+    def snapshot(self):
+        """{market: {(target_id, side_yes): stake}}; side_yes is False except for props."""
+        self.ensure_loaded()
+        with self._lock:
+            out = {m: {(t, False): s for t, s in self.stakes[m].items()}
+                   for m in MARKETS if m != "prop"}
+            out["prop"] = dict(self.prop_sides)
+            return out
+
+    def projected_payout(self, market, target_id, stake, side_yes=None):
+        """
+        What `stake` on `target_id` would pay if it won, at the current
+        pools (app.payouts arithmetic).  Props pay from their own pool;
+        an advance projection assumes no other runner advances, so it is
+        an upper bound.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            if market == "prop":
+                pool = self.stakes["prop"].get(target_id, 0.0)
+                backing = self.prop_sides.get((target_id, bool(side_yes)), 0.0)
+            else:
+                pool = self.totals[market]
+                backing = self.stakes[market].get(target_id, 0.0)
+            if backing <= 0:
+                return 0.0
+            return round(stake / backing * pool * (1.0 - HOUSE), 2)
+
+    # ─── consistency ─────────────────────────────────────────────
+    def verify(self, session):
+        """
+        Compare ledger odds with the SQL result.
+
+        Returns {market: {target_id: (ledger, sql)}} for every entry that
+        differs; an empty dict means the ledger is consistent.
+        """
+        if self.sync_seconds:
+            self.sync(session)
+        expected = {
+            "advance": pool_odds(session, AdvanceBet, AdvanceBet.player_id),
+            "win":     pool_odds(session, WinBet, WinBet.player_id),
+            "prop":    pool_odds(session, PropBet, PropBet.prop_id),
+            "prop_sides": prop_odds(session),
+        }
+        actual = {m: self.pool_odds(m) for m in MARKETS}
+        actual["prop_sides"] = self.prop_odds()
+
+        drift = {}
+        for market, sql in expected.items():
+            mine = actual[market]
+            diffs = {k: (mine.get(k), sql.get(k))
+                     for k in set(sql) | set(mine)
+                     if not _same(mine.get(k), sql.get(k))}
+            if diffs:
+                drift[market] = diffs
+        return drift
+
+
+def _same(a, b):
+    """Equal up to float noise below the rounding the odds are shown at."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) < 1e-6
+    return a == b
+
+
+ledger = PoolLedger()
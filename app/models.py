@@ -1,16 +1,77 @@
 import os, uuid, datetime as dt
-from sqlalchemy import Column, String, Integer, Boolean, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, Float, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.sqlite import BLOB as UUID  # ok for SQLite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from datetime import datetime
 
 load_dotenv()
 DATABASE_URL = os.environ["DATABASE_URL"]
+
+# SQLite storage profiles, applied as PRAGMAs on every pooled connection.
+# SQLITE_PROFILE picks one; SQLITE_<PRAGMA> (e.g. SQLITE_BUSY_TIMEOUT=2000)
+# overrides a single setting.
+SQLITE_PROFILES = {
+    # sqlite / pysqlite defaults: rollback journal, readers block the writer
+    "default": {},
+    # readers never block the writer; fsync only at checkpoints, so a
+    # committed (acknowledged) bet can be lost on power loss
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,           # KiB, i.e. 64 MiB
+        "busy_timeout": 5000,               # ms
+    },
+    # WAL, but fsync every commit (survives power loss, not just crashes);
+    # the default: the bet writer's group commit spreads that one fsync
+    # over a whole batch, and a bet is acknowledged only once it is durable
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -16 * 1024,
+        "busy_timeout": 10000,
+    },
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "durable")
+
+
+def sqlite_pragmas(profile=SQLITE_PROFILE):
+    """PRAGMA settings for `profile`, with SQLITE_<PRAGMA> env overrides."""
+    try:
+        pragmas = dict(SQLITE_PROFILES[profile])
+    except KeyError:
+        raise ValueError(f"unknown SQLITE_PROFILE {profile!r}; "
+                         f"choose from {', '.join(SQLITE_PROFILES)}") from None
+    for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout"):
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def apply_storage_profile(engine, profile=SQLITE_PROFILE):
+    """Run the profile's PRAGMAs on each new DBAPI connection of a SQLite engine."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
 engine = create_engine(DATABASE_URL, future=True, echo=False)
+apply_storage_profile(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, future=True)
 
 Base = declarative_base()
@@ -19,6 +80,9 @@ Base = declarative_base()
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (
+        Index("ux_players_entry", "player_name", "heat", "division", unique=True),
+    )
     id = Column(String, primary_key=True,
                 default=lambda: str(uuid.uuid4()))
     player_name = Column(String, nullable=False)
@@ -37,6 +101,10 @@ class PropUniverse(Base):
 
 class AdvanceBet(Base):
     __tablename__ = "advance_bets"
+    __table_args__ = (
+        Index("ix_advance_bets_player", "player_id", "bettor_email", "amount"),
+        Index("ix_advance_bets_bettor", "bettor_email"),
+    )
     bet_id        = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     player_id     = Column(String, ForeignKey("players.id"), nullable=False)
     bettor_email  = Column(String, nullable=False)          
@@ -45,6 +113,10 @@ class AdvanceBet(Base):
 
 class WinBet(Base):
     __tablename__ = "win_bets"
+    __table_args__ = (
+        Index("ix_win_bets_player", "player_id", "bettor_email", "amount"),
+        Index("ix_win_bets_bettor", "bettor_email"),
+    )
     bet_id        = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     player_id     = Column(String, ForeignKey("players.id"), nullable=False)
     bettor_email  = Column(String, nullable=False)      
@@ -61,6 +133,10 @@ class User(Base):
 
 class PropBet(Base):
     __tablename__ = "prop_bets"
+    __table_args__ = (
+        Index("ix_prop_bets_prop", "prop_id", "side_yes", "bettor_email", "amount"),
+        Index("ix_prop_bets_bettor", "bettor_email"),
+    )
     bet_id        = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     prop_id       = Column(String, ForeignKey("prop_universe.id"), nullable=False)
     side_yes      = Column(Boolean, nullable=False)
@@ -68,3 +144,39 @@ class PropBet(Base):
     amount        = Column(Float,  nullable=False)
     placed_at     = Column(DateTime, default=datetime.utcnow)
 
+
+class PoolTotal(Base):
+    """Stake per market / target, kept current by the triggers in schema.sql."""
+    __tablename__ = "pool_totals"
+    market        = Column(String,  primary_key=True)    # advance | win | prop
+    target_id     = Column(String,  primary_key=True)
+    side_yes      = Column(Boolean, primary_key=True, default=False)
+    stake         = Column(Float,   nullable=False, default=0.0)
+    n_bets        = Column(Integer, nullable=False, default=0)
+
+
+class OddsHistory(Base):
+    """
+    Pool stake per market / target at ts (unix seconds, a multiple of the
+    snapshot interval); written only when the stake changed.  See app/history.py.
+    """
+    __tablename__ = "odds_history"
+    __table_args__ = (
+        Index("ix_odds_history_market_ts", "market", "ts"),
+    )
+    market        = Column(String,  primary_key=True)    # advance | win | prop
+    target_id     = Column(String,  primary_key=True)
+    side_yes      = Column(Boolean, primary_key=True, default=False)
+    ts            = Column(Integer, primary_key=True)
+    stake         = Column(Float,   nullable=False)
+
+
+class BettorPosition(Base):
+    """Stake per bettor / market / target, kept current by the triggers in schema.sql."""
+    __tablename__ = "bettor_positions"
+    bettor_email  = Column(String,  primary_key=True)
+    market        = Column(String,  primary_key=True)    # advance | win | prop
+    target_id     = Column(String,  primary_key=True)
+    side_yes      = Column(Boolean, primary_key=True, default=False)
+    stake         = Column(Float,   nullable=False, default=0.0)
+    n_bets        = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,233 @@
+"""
+Monte Carlo settlement simulator.
+
+The advance market pays on a *set* of winners, so its outcome space
+cannot be enumerated the way app/whatif.py does for win and props.
+Instead `simulate()` samples joint outcomes from the current implied
+probabilities and settles every sample with the arithmetic of
+app.payouts:
+
+▪ advance: in every heat, `advancers` runners go through, drawn without
+  replacement with weights proportional to their stake (the implied
+  probabilities of pool_odds), via the Gumbel top-k trick
+▪ win: one winner, drawn with the pool_odds probabilities
+▪ props: each prop resolves independently, yes with probability
+  yes stake / (yes + no stake)
+
+Per-bettor stakes are held as dense bettor x target matrices, so
+settling a block of samples is one matrix product per market; payouts
+are rounded to the cent per bettor and market like app.payouts.  Blocks
+are spread over a process pool and only running sums come back, plus a
+count of each distinct amount (in cents) a market paid out in total; its
+quantiles are read off those counts.  Memory is bounded by the bettors
+and the range of payout totals, not by the sample count.
+"""
+
+import os, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sqlalchemy import select
+from .models import Player
+from .payouts import HOUSE_TAKE
+from .whatif import stake_frame
+
+MARKETS = ("advance", "win", "prop")
+BLOCK_CELLS = 4_000_000     # samples x bettors per matrix product
+
+
+def load_book(session, advancers=2):
+    """Snapshot the stakes the simulator needs as plain (picklable) arrays."""
+    frames = {m: stake_frame(session, m) for m in MARKETS}
+    bettors = sorted(set().union(*(set(f["bettor_email"]) for f in frames.values())))
+    col = {e: i for i, e in enumerate(bettors)}
+    book = {"bettors": bettors, "advancers": advancers, "net": 1.0 - HOUSE_TAKE}
+
+    def matrix(df, targets, key):
+        index = {t: j for j, t in enumerate(targets)}
+        S = np.zeros((len(bettors), len(targets)))
+        np.add.at(S, (df["bettor_email"].map(col).to_numpy(), key.map(index).to_numpy()),
+                  df["stake"].to_numpy())
+        return S
+
+    for market in ("advance", "win"):
+        df = frames[market]
+        targets = sorted(set(df["target_id"]))
+        S = matrix(df, targets, df["target_id"])
+        book[market] = {"targets": targets, "S": S, "stake": S.sum(axis=0)}
+
+    # advance heats: runners grouped by (division, heat)
+    heats = {}
+    index = {t: j for j, t in enumerate(book["advance"]["targets"])}
+    for pid, division, heat in session.execute(
+            select(Player.id, Player.division, Player.heat)):
+        if pid in index:
+            heats.setdefault((division, heat), []).append(index[pid])
+    book["advance"]["heats"] = [np.array(v) for v in heats.values()]
+
+    # props: one column per (prop, side); yes at 2i, no at 2i + 1
+    df = frames["prop"]
+    props = sorted(set(df["target_id"]))
+    keys = df["target_id"] + np.where(df["side_yes"], ":yes", ":no")
+    columns = [f"{p}:{side}" for p in props for side in ("yes", "no")]
+    S = matrix(df, columns, keys)
+    stake = S.sum(axis=0)
+    book["prop"] = {"targets": props, "S": S, "stake": stake,
+                    "pool": stake[0::2] + stake[1::2]}
+    return book
+
+
+# ─── worker side ─────────────────────────────────────────────────
+_BOOK = None
+
+
+def _init(book):
+    global _BOOK
+    _BOOK = book
+
+
+def _weights_advance(book, rng, n):
+    """(n, targets) payout weight per unit stake for n sampled outcomes."""
+    m = book["advance"]
+    stake, W = m["stake"], np.zeros((n, len(m["stake"])))
+    with np.errstate(divide="ignore"):
+        logw = np.log(stake)
+    for heat in m["heats"]:
+        k = min(book["advancers"], len(heat))
+        keys = logw[heat] + rng.gumbel(size=(n, len(heat)))
+        top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        W[np.arange(n)[:, None], heat[top]] = 1.0
+    winning = W @ stake
+    factor = np.divide(stake.sum() * book["net"], winning,
+                       out=np.zeros(n), where=winning > 0)
+    return W * factor[:, None]
+
+
+def _weights_win(book, rng, n):
+    m = book["win"]
+    stake, G = m["stake"], np.zeros((n, len(m["stake"])))
+    total = stake.sum()
+    if total > 0:
+        winner = rng.choice(len(stake), size=n, p=stake / total)
+        G[np.arange(n), winner] = total * book["net"] / stake[winner]
+    return G
+
+
+def _weights_prop(book, rng, n):
+    m = book["prop"]
+    yes, no, pool = m["stake"][0::2], m["stake"][1::2], m["pool"]
+    q = np.divide(yes, pool, out=np.zeros_like(pool), where=pool > 0)
+    won_yes = rng.random((n, len(pool))) < q
+    col = 2 * np.arange(len(pool)) + np.where(won_yes, 0, 1)
+    backing = np.where(won_yes, yes, no)
+    G = np.zeros((n, len(m["stake"])))
+    np.put_along_axis(G, col, np.divide(pool * book["net"], backing,
+                                        out=np.zeros_like(backing), where=backing > 0), axis=1)
+    return G
+
+
+_WEIGHTS = {"advance": _weights_advance, "win": _weights_win, "prop": _weights_prop}
+
+
+def _run(args):
+    """Simulate `n` samples; return running sums per market (+ "total")."""
+    n, seed = args
+    book, rng = _BOOK, np.random.default_rng(seed)
+    B = len(book["bettors"])
+    block = max(1, min(n, BLOCK_CELLS // max(B, 1)))
+    acc = {m: {"sum": np.zeros(B), "sumsq": np.zeros(B), "paid": np.zeros(B),
+               "max": np.zeros(B), "cents": {}} for m in MARKETS + ("total",)}
+    done = 0
+    while done < n:
+        k = min(block, n - done)
+        total = np.zeros((k, B))
+        for market in MARKETS:
+            P = np.round(_WEIGHTS[market](book, rng, k) @ book[market]["S"].T, 2)
+            total += P
+            _accumulate(acc[market], P)
+        _accumulate(acc["total"], np.round(total, 2))
+        done += k
+    return acc
+
+
+def _accumulate(a, P):
+    a["sum"] += P.sum(axis=0)
+    a["sumsq"] += np.einsum("ij,ij->j", P, P)
+    a["paid"] += np.count_nonzero(P, axis=0)
+    np.maximum(a["max"], P.max(axis=0), out=a["max"])
+    _count(a["cents"], *np.unique(np.rint(P.sum(axis=1) * 100).astype(np.int64),
+                                  return_counts=True))
+
+
+def _count(cents, values, counts):
+    for v, c in zip(values.tolist(), counts.tolist()):
+        cents[v] = cents.get(v, 0) + c
+
+
+def _percentile(values, counts, q):
+    """np.percentile(q) (linear) of the sample holding each values[i] counts[i] times."""
+    upto = np.cumsum(counts)
+    pos = q / 100 * (upto[-1] - 1)
+    lo = int(pos)
+    a, b = values[np.searchsorted(upto, [lo + 1, min(lo + 2, upto[-1])])]
+    return a + (b - a) * (pos - lo)
+
+
+# ─── driver ──────────────────────────────────────────────────────
+def simulate(book, samples, workers=None, seed=0):
+    """
+    Run `samples` joint outcomes over `workers` processes (default: all
+    CPUs) and return {samples, workers, seconds, markets, bettors}.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = min(samples, workers * 4)
+    sizes = [samples // tasks + (i < samples % tasks) for i in range(tasks)]
+    seeds = np.random.SeedSequence(seed).spawn(tasks)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(book,)) as pool:
+        parts = list(pool.map(_run, zip(sizes, seeds)))
+    seconds = time.perf_counter() - t0
+
+    merged = {}
+    for market in MARKETS + ("total",):
+        a = [p[market] for p in parts]
+        cents = {}
+        for x in a:
+            _count(cents, np.array(list(x["cents"])), np.array(list(x["cents"].values())))
+        merged[market] = {
+            "sum": sum(x["sum"] for x in a), "sumsq": sum(x["sumsq"] for x in a),
+            "paid": sum(x["paid"] for x in a),
+            "max": np.max([x["max"] for x in a], axis=0),
+            "cents": cents,
+        }
+
+    markets = {}
+    for market in MARKETS:
+        m = merged[market]
+        values = np.array(sorted(m["cents"]), dtype=np.int64)
+        counts = np.array([m["cents"][v] for v in values.tolist()])
+        dollars = lambda c: round(float(c) / 100, 2)
+        markets[market] = {
+            "pool": round(float(book[market]["stake"].sum()), 2),
+            "expected_paid": dollars(values @ counts / samples),
+            "paid_p5": dollars(_percentile(values, counts, 5)),
+            "paid_p50": dollars(_percentile(values, counts, 50)),
+            "paid_p95": dollars(_percentile(values, counts, 95)),
+            "expected_winners": round(float(m["paid"].sum() / samples), 2),
+        }
+
+    bettors = {}
+    for i, email in enumerate(book["bettors"]):
+        row = {}
+        for market in MARKETS + ("total",):
+            if market != "total" and not book[market]["S"][i].any():
+                continue
+            m = merged[market]
+            mean = m["sum"][i] / samples
+            var = max(m["sumsq"][i] / samples - mean * mean, 0.0)
+            row[market] = {"mean": round(float(mean), 2), "std": round(float(var ** 0.5), 2),
+                           "p_paid": round(float(m["paid"][i] / samples), 4),
+                           "max": round(float(m["max"][i]), 2)}
+        bettors[email] = row
+
+    return {"samples": samples, "workers": workers, "seconds": round(seconds, 2),
+            "advancers_per_heat": book["advancers"], "markets": markets, "bettors": bettors}
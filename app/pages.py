@@ -0,0 +1,158 @@
+"""
+Cached page models for the market pages.
+
+A page model is everything a market template needs: the roster nested
+by division (and heat), the market odds and the stake totals.  Models
+are keyed on (roster version, pool tag) and rebuilt only when one of
+those moves:
+
+▪ the pool tag comes from the ledger (`ledger.tag()`) and moves with
+  every bet committed in that market, identically in every worker
+▪ the roster version is the mtime of ROSTER_STAMP, which
+  scripts/refresh_entities touches whenever it rewrites players/props
+
+A cache hit therefore costs one stat() and no DB queries, bar one ledger
+sync after this worker's own bets.  The same versions feed the weak
+ETags on the HTML pages.
+"""
+
+import hashlib, os, threading
+from collections import namedtuple
+from pathlib import Path
+from sqlalchemy import select
+from .models import Player, PropUniverse
+from .snapshot import reads
+from .ledger import ledger
+
+ROSTER_STAMP = Path(os.getenv("ROSTER_STAMP", "data/roster.stamp"))
+
+Runner = namedtuple("Runner", "id player_name heat division")
+Prop = namedtuple("Prop", "id prop_name")
+
+# templates are part of what a page ETag vouches for
+_TEMPLATES = Path(__file__).parent / "templates"
+BUILD_ID = hashlib.sha1(b"".join(
+    p.read_bytes() for p in sorted(_TEMPLATES.glob("*.html")))).hexdigest()[:8]
+
+
+def roster_version():
+    try:
+        return ROSTER_STAMP.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_roster_version():
+    """Invalidate every cached page model in every worker."""
+    ROSTER_STAMP.parent.mkdir(parents=True, exist_ok=True)
+    ROSTER_STAMP.write_text(str(os.getpid()))
+    os.utime(ROSTER_STAMP)
+
+
+def version(market):
+    # ledger.tag(): page ETags must agree across workers
+    return roster_version(), ledger.tag(market)
+
+
+def etag(name, page_version, user_email):
+    raw = f"{BUILD_ID}:{name}:{page_version}:{user_email}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+class PageCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, name, key, build):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        value = build()
+        with self._lock:
+            self._entries[name] = (key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+page_cache = PageCache()
+
+
+# ─── rosters (DB; keyed on roster version only) ───────────────────
+def _advance_roster():
+    with reads.session(fresh=True) as db:
+        rows = db.execute(
+            select(Player.id, Player.player_name, Player.heat, Player.division)
+            .order_by(Player.division, Player.heat, Player.player_name)
+        ).all()
+    divisions = {}
+    for r in map(Runner._make, rows):
+        divisions.setdefault(r.division, {}).setdefault(r.heat, []).append(r)
+    return divisions
+
+
+def _win_roster():
+    with reads.session(fresh=True) as db:
+        rows = db.execute(
+            select(Player.id, Player.player_name, Player.heat, Player.division)
+            .where(Player.active == True)
+            .order_by(Player.division, Player.player_name)
+        ).all()
+    divisions = {}
+    for r in map(Runner._make, rows):
+        divisions.setdefault(r.division, []).append(r)
+    return divisions
+
+
+def _prop_roster():
+    with reads.session(fresh=True) as db:
+        rows = db.execute(
+            select(PropUniverse.id, PropUniverse.prop_name)
+            .where(PropUniverse.active == True)
+        ).all()
+    return [Prop._make(r) for r in rows]
+
+
+# ─── page models (memory only once the roster is cached) ──────────
+def advance_model(page_version):
+    def build():
+        divisions = page_cache.get("advance-roster", page_version[0], _advance_roster)
+        odds = ledger.pool_odds("advance")
+        stake = lambda pl: odds.get(pl.id, {}).get("stake", 0)
+        return {
+            "divisions": divisions,
+            "odds": odds,
+            "pool_total": ledger.pool_total("advance"),
+            "div_totals": {d: sum(stake(pl) for heats in h.values() for pl in heats)
+                           for d, h in divisions.items()},
+            "heat_totals": {(d, h): sum(stake(pl) for pl in players)
+                            for d, heats in divisions.items()
+                            for h, players in heats.items()},
+        }
+    return page_cache.get("advance", page_version, build)
+
+
+def win_model(page_version):
+    def build():
+        divisions = page_cache.get("win-roster", page_version[0], _win_roster)
+        odds = ledger.pool_odds("win")
+        return {
+            "divisions": divisions,
+            "odds": odds,
+            "div_totals": {d: sum(odds.get(pl.id, {}).get("stake", 0) for pl in plist)
+                           for d, plist in divisions.items()},
+        }
+    return page_cache.get("win", page_version, build)
+
+
+def props_model(page_version):
+    def build():
+        return {
+            "props": page_cache.get("prop-roster", page_version[0], _prop_roster),
+            "odds": ledger.prop_odds(),
+            "pool_total": ledger.pool_total("prop"),
+        }
+    return page_cache.get("props", page_version, build)
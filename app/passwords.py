@@ -0,0 +1,91 @@
+"""
+Password hashing off the request path.
+
+Werkzeug's password hashes are deliberately slow KDFs (scrypt by
+default), so hashing inline lets a burst of logins at event start eat
+the CPU that /bet needs.  Here every hash and verification runs on a
+small process pool instead:
+
+▪ at most HASH_WORKERS KDFs run at once per server process, in worker
+  processes started with os.nice(HASH_NICE) so the scheduler prefers
+  request handlers over them
+▪ at most HASH_QUEUE requests may be waiting for or using the pool; the
+  next one gets `HashBusy` straight away (the views answer 503 +
+  Retry-After) instead of piling up behind the others
+▪ a request that waited HASH_TIMEOUT seconds gives up with `HashBusy`
+  too; its slot is only freed once its KDF is cancelled or finishes,
+  so abandoned hashes still count against HASH_QUEUE
+
+Workers are started with forkserver, not fork, so they do not inherit
+the bet writer's threads and locks.
+"""
+
+import atexit, multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+WORKERS = int(os.getenv("HASH_WORKERS", "1"))
+QUEUE = int(os.getenv("HASH_QUEUE", "8"))
+TIMEOUT = float(os.getenv("HASH_TIMEOUT", "5"))
+NICE = int(os.getenv("HASH_NICE", "5"))
+
+
+class HashBusy(Exception):
+    """The hashing pool is saturated; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("password hashing is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    def __init__(self, workers=WORKERS, queue=QUEUE, timeout=TIMEOUT, nice=NICE):
+        self.workers = workers
+        self.timeout = timeout
+        self.nice = nice
+        self._slots = threading.BoundedSemaphore(queue)
+        self._pool = None
+        self._start_lock = threading.Lock()
+
+    def hash(self, password):
+        """generate_password_hash(password), run on the pool."""
+        return self._call(generate_password_hash, password)
+
+    def verify(self, pwhash, password):
+        """check_password_hash(pwhash, password), run on the pool."""
+        return self._call(check_password_hash, pwhash, password)
+
+    def _call(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashBusy()
+        try:
+            fut = self._ensure_started().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # a running task can't be cancelled: hold the slot until it is done
+        fut.add_done_callback(lambda _: self._slots.release())
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            fut.cancel()
+            raise HashBusy() from None
+
+    def _ensure_started(self):
+        if self._pool is not None:
+            return self._pool
+        with self._start_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=os.nice, initargs=(self.nice,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+passwords = PasswordPool()
+atexit.register(passwords.close)
@@ -114,6 +114,13 @@ def calculate_prop_payouts(session, prop_results):
     """
     Calculate payouts for prop bet winners.
     
+    Three queries for all resolved props, each a range scan of the
+    covering index on (prop_id, side_yes, bettor_email, amount): every
+    prop's pool plus stake and bet count per side, then the bets on the
+    winning yes sides and on the winning no sides, in index order.  Bets
+    are paid one by one, prop by prop, with the same arithmetic as
+    settling each prop on its own, so the result is identical to the cent.
+    
     Args:
         session: Database session
         prop_results: dict {prop_id: True/False} where True=Yes won, False=No won
@@ -124,37 +131,61 @@ def calculate_prop_payouts(session, prop_results):
     if not prop_results:
         return {}
     
+    # Core rows through session.connection(): no ORM result processing per row
+    conn = session.connection()
+    
+    # Total pool per prop (both sides), winning stake and winning bet count
+    pools = {}
+    for prop_id, total_pool, *sides in conn.execute(
+        select(PropBet.prop_id, func.sum(PropBet.amount),
+               func.sum(PropBet.amount).filter(PropBet.side_yes == True),
+               func.count().filter(PropBet.side_yes == True),
+               func.sum(PropBet.amount).filter(PropBet.side_yes == False),
+               func.count().filter(PropBet.side_yes == False))
+        .where(PropBet.prop_id.in_(list(prop_results)))
+        .group_by(PropBet.prop_id)
+        .order_by(PropBet.prop_id)
+    ).all():
+        yes_won = bool(prop_results[prop_id])
+        pools[prop_id] = (total_pool, *(sides[:2] if yes_won else sides[2:]))
+    
+    # Bets on the winning side of each prop, one scan per side.  The rows
+    # come in prop_id order, so each prop's bets are the next `count` rows.
+    # They are read in chunks into flat lists rather than kept as row
+    # objects, which would keep the garbage collector busy on big books.
+    winning_bets = {}
+    for side_yes in (True, False):
+        props = [p for p in pools if bool(prop_results[p]) == side_yes and pools[p][2]]
+        if not props:
+            continue
+        emails, amounts = [], []
+        for chunk in conn.execute(
+            select(PropBet.bettor_email, PropBet.amount)
+            .where(PropBet.prop_id.in_(props), PropBet.side_yes == side_yes)
+            .order_by(PropBet.prop_id, PropBet.bettor_email, PropBet.amount)
+        ).partitions(5000):
+            for bettor_email, bet_amount in chunk:
+                emails.append(bettor_email)
+                amounts.append(bet_amount)
+        if len(emails) != sum(pools[p][2] for p in props):
+            raise RuntimeError("prop bets changed during settlement; settle after betting closes")
+        start = 0
+        for prop_id in props:
+            end = start + pools[prop_id][2]
+            winning_bets[prop_id] = zip(emails[start:end], amounts[start:end])
+            start = end
+    
     payouts = {}
     
-    for prop_id, yes_won in prop_results.items():
-        # Get total pool for this prop (both yes and no sides)
-        total_pool = session.scalar(
-            select(func.sum(PropBet.amount))
-            .where(PropBet.prop_id == prop_id)
-        ) or 0.0
-        
-        if total_pool <= 0:
+    for prop_id in prop_results:
+        total_pool, winning_stake, _ = pools.get(prop_id, (0.0, 0.0, 0))
+        if not total_pool or total_pool <= 0 or not winning_stake or winning_stake <= 0:
             continue
         
         # Apply house take
         payout_pool = total_pool * (1.0 - HOUSE_TAKE)
         
-        # Get total stake on winning side
-        winning_stake = session.scalar(
-            select(func.sum(PropBet.amount))
-            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)
-        ) or 0.0
-        
-        if winning_stake <= 0:
-            continue
-        
-        # Get all bets on winning side
-        winning_bets = session.execute(
-            select(PropBet.bettor_email, PropBet.amount)
-            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)
-        ).fetchall()
-        
-        for bettor_email, bet_amount in winning_bets:
+        for bettor_email, bet_amount in winning_bets[prop_id]:
             # Payout = (bet_amount / total_winning_stake) * payout_pool
             payout = (bet_amount / winning_stake) * payout_pool
             payouts[bettor_email] = payouts.get(bettor_email, 0.0) + payout
@@ -0,0 +1,97 @@
+"""
+Per-bettor positions ("my bets").
+
+A user's stake per market / target is read from bettor_positions, which
+the triggers in schema.sql keep current on every bet insert, so a
+portfolio costs O(positions) instead of O(bets).  Implied probabilities
+and projected payouts come from the pool ledger, i.e. live odds.
+
+Databases without the triggers (non-SQLite) group the bet tables by
+bettor_email instead, which the ix_*_bettor indexes keep to the user's
+own rows.
+"""
+
+from sqlalchemy import select, func, literal, union_all
+from sqlalchemy.exc import OperationalError
+from .models import AdvanceBet, WinBet, PropBet, BettorPosition, Player, PropUniverse
+from .ledger import ledger, MARKETS
+
+
+def _rows(session, email):
+    """[(market, target_id, side_yes, stake, n_bets)] for `email`."""
+    if session.bind.dialect.name == "sqlite":
+        try:
+            return session.execute(
+                select(BettorPosition.market, BettorPosition.target_id,
+                       BettorPosition.side_yes, BettorPosition.stake, BettorPosition.n_bets)
+                .where(BettorPosition.bettor_email == email, BettorPosition.n_bets > 0)
+            ).all()
+        except OperationalError:
+            session.rollback()      # table not installed yet
+    parts = [
+        select(literal(market), target, side, func.sum(model.amount), func.count())
+        .where(model.bettor_email == email)
+        .group_by(target, side)
+        for market, model, target, side in (
+            ("advance", AdvanceBet, AdvanceBet.player_id, literal(False)),
+            ("win",     WinBet,     WinBet.player_id,     literal(False)),
+            ("prop",    PropBet,    PropBet.prop_id,      PropBet.side_yes),
+        )
+    ]
+    return session.execute(union_all(*parts)).all()
+
+
+def _names(session, rows):
+    players = {t for m, t, *_ in rows if m != "prop"}
+    props = {t for m, t, *_ in rows if m == "prop"}
+    names = {}
+    if players:
+        names.update(session.execute(
+            select(Player.id, Player.player_name).where(Player.id.in_(players))).all())
+    if props:
+        names.update(session.execute(
+            select(PropUniverse.id, PropUniverse.prop_name)
+            .where(PropUniverse.id.in_(props))).all())
+    return names
+
+
+def portfolio(session, email):
+    """
+    {bettor_email, total_stake, n_bets, positions: [...]} where each position
+    is {market, target_id, target_name, side, stake, n_bets, prob,
+    projected_payout}; side is "yes" / "no" for props and None otherwise.
+    """
+    rows = _rows(session, email)
+    names = _names(session, rows)
+    odds = {}
+
+    def prob(market, target_id, side):
+        if market not in odds:
+            odds[market] = ledger.prop_odds() if market == "prop" else ledger.pool_odds(market)
+        entry = odds[market].get(target_id, {})
+        if side is not None:
+            entry = entry.get(side, {})
+        return entry.get("prob", 0.0)
+
+    out = []
+    for market, target_id, side_yes, stake, n_bets in rows:
+        target_id = str(target_id)
+        side = ("yes" if side_yes else "no") if market == "prop" else None
+        out.append({
+            "market": market,
+            "target_id": target_id,
+            "target_name": names.get(target_id, target_id),
+            "side": side,
+            "stake": round(float(stake), 2),
+            "n_bets": n_bets,
+            "prob": prob(market, target_id, side),
+            "projected_payout": ledger.projected_payout(
+                market, target_id, float(stake), side_yes if market == "prop" else None),
+        })
+    out.sort(key=lambda p: (MARKETS.index(p["market"]), p["target_name"], p["side"] or ""))
+    return {
+        "bettor_email": email,
+        "total_stake": round(sum(p["stake"] for p in out), 2),
+        "n_bets": sum(p["n_bets"] for p in out),
+        "positions": out,
+    }
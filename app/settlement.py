@@ -0,0 +1,183 @@
+"""
+Settlement engine.
+
+`settle()` returns the same `(payouts, summary)` pair as
+app.payouts.calculate_all_payouts / get_payout_summary, but settles each
+market once instead of once per call.  Each market reads only its pool
+total and its winning bets, through the covering indexes
+(scripts/migrate_indexes.py), with the app.payouts functions themselves,
+so both code paths agree to the cent.  Reading whole books into pandas
+was slower than that once the indexes were in place.
+
+`stream_payouts()` is the export flavour: it yields one row per winning
+bettor while the winning bets are still being read (ordered by email,
+fetched with yield_per), so memory stays flat however many bettors an
+event has.  `export_lines()` renders those rows as CSV or JSON Lines.
+"""
+
+import csv, io, json
+from sqlalchemy import select, func, literal, union_all, and_, or_, literal_column
+from .models import AdvanceBet, WinBet, PropBet
+from .payouts import (HOUSE_TAKE, calculate_advance_payouts, calculate_win_payouts,
+                      calculate_prop_payouts)
+
+CHUNK = 50_000      # rows per streamed partition
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ("bettor_email", "advance", "win", "props", "total")
+
+
+def settle(session, results):
+    """
+    Settle every market once.
+
+    Args:
+        session: Database session
+        results: same dict as app.payouts.calculate_all_payouts
+
+    Returns:
+        (payouts, summary) matching calculate_all_payouts and
+        get_payout_summary for the same results.
+    """
+    summary = {
+        'total_payouts': {},
+        'market_breakdown': {},
+        'house_take': HOUSE_TAKE
+    }
+    breakdown = summary['market_breakdown']
+
+    def _book(key, model, payouts, **extra):
+        total = session.scalar(select(func.sum(model.amount))) or 0.0
+        breakdown[key] = {
+            'total_pool': round(total, 2),
+            'payout_pool': round(total * (1.0 - HOUSE_TAKE), 2),
+            **extra,
+            'payouts': payouts,
+        }
+        for email, amount in payouts.items():
+            summary['total_payouts'][email] = summary['total_payouts'].get(email, 0.0) + amount
+
+    if 'advance_winners' in results:
+        _book('advance', AdvanceBet,
+              calculate_advance_payouts(session, results['advance_winners']),
+              winners=results['advance_winners'])
+
+    if 'win_winner' in results:
+        _book('win', WinBet, calculate_win_payouts(session, results['win_winner']),
+              winner=results['win_winner'])
+
+    if 'prop_results' in results:
+        _book('props', PropBet, calculate_prop_payouts(session, results['prop_results']),
+              results=results['prop_results'])
+
+    summary['total_payouts'] = {email: round(amount, 2)
+                                for email, amount in summary['total_payouts'].items()}
+    return dict(summary['total_payouts']), summary
+
+
+# ─── streaming export ────────────────────────────────────────────
+def _winning_bets(session, results):
+    """
+    (pools, stmt): pools maps (market, prop_id or None) to (winning stake,
+    net pool); stmt selects every winning bet as (market, target, email,
+    amount) ordered by bettor_email.
+    """
+    pools, parts = {}, []
+    net = lambda total: float(total) * (1.0 - HOUSE_TAKE)
+
+    def _part(market, model, target, where):
+        return (select(literal(market).label("market"), target.label("target_id"),
+                       model.bettor_email.label("bettor_email"), model.amount)
+                .where(where))
+
+    winners = results.get('advance_winners')
+    if winners:
+        total = session.scalar(select(func.sum(AdvanceBet.amount))) or 0.0
+        stake = session.scalar(select(func.sum(AdvanceBet.amount))
+                               .where(AdvanceBet.player_id.in_(winners))) or 0.0
+        if total > 0 and stake > 0:
+            pools[('advance', None)] = (float(stake), net(total))
+            parts.append(_part('advance', AdvanceBet, AdvanceBet.player_id,
+                               AdvanceBet.player_id.in_(winners)))
+
+    winner = results.get('win_winner')
+    if winner:
+        total = session.scalar(select(func.sum(WinBet.amount))) or 0.0
+        stake = session.scalar(select(func.sum(WinBet.amount))
+                               .where(WinBet.player_id == winner)) or 0.0
+        if total > 0 and stake > 0:
+            pools[('win', None)] = (float(stake), net(total))
+            parts.append(_part('win', WinBet, WinBet.player_id, WinBet.player_id == winner))
+
+    prop_results = {p: bool(v) for p, v in (results.get('prop_results') or {}).items()}
+    if prop_results:
+        totals, stakes = {}, {}
+        for prop_id, side_yes, amount in session.execute(
+            select(PropBet.prop_id, PropBet.side_yes, func.sum(PropBet.amount))
+            .where(PropBet.prop_id.in_(list(prop_results)))
+            .group_by(PropBet.prop_id, PropBet.side_yes)
+        ):
+            totals[prop_id] = totals.get(prop_id, 0.0) + float(amount)
+            if bool(side_yes) == prop_results[prop_id]:
+                stakes[prop_id] = float(amount)
+        for prop_id, stake in stakes.items():
+            if stake > 0:
+                pools[('prop', prop_id)] = (stake, net(totals[prop_id]))
+        sides = [and_(PropBet.prop_id.in_([p for p, v in prop_results.items() if v is yes]),
+                      PropBet.side_yes.is_(yes)) for yes in (True, False)]
+        parts.append(_part('prop', PropBet, PropBet.prop_id, or_(*sides)))
+
+    if not parts:
+        return pools, None
+    return pools, union_all(*parts).order_by(literal_column("bettor_email"))
+
+
+def stream_payouts(session, results, yield_per=CHUNK):
+    """
+    Yield {bettor_email, advance, win, props, total} for every bettor with a
+    payout, in email order, using the same arithmetic and rounding as
+    settle().  Holds one bettor's running sums at a time.
+    """
+    pools, stmt = _winning_bets(session, results)
+    if stmt is None:
+        return
+    rows = session.execute(stmt.execution_options(yield_per=yield_per))
+
+    def _row(email, sums):
+        row = {'bettor_email': email}
+        row.update((m, round(v, 2)) for m, v in sums.items())
+        row['total'] = round(row['advance'] + row['win'] + row['props'], 2)
+        return row
+
+    email, sums = None, None
+    for market, target, bettor, amount in rows:
+        pool = pools.get((market, target if market == 'prop' else None))
+        if pool is None:
+            continue
+        if bettor != email:
+            if email is not None:
+                yield _row(email, sums)
+            email, sums = bettor, {'advance': 0.0, 'win': 0.0, 'props': 0.0}
+        stake, net = pool
+        sums['props' if market == 'prop' else market] += float(amount) / stake * net
+    if email is not None:
+        yield _row(email, sums)
+
+
+def export_lines(rows, fmt):
+    """Render stream_payouts() rows as CSV (with header) or JSON Lines, lazily."""
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(row) + "\n"
+        return
+    if fmt != "csv":
+        raise ValueError(f"unknown export format {fmt!r}")
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
@@ -0,0 +1,181 @@
+"""
+Read snapshots.
+
+Odds-history and per-user reads go through `reads`, a second engine with its
+own small connection pool, opened read-only (mode=ro, query_only) so it
+never takes a write lock or a connection the bet writer is waiting for.
+
+In WAL mode every pooled connection holds one open read transaction,
+i.e. a consistent snapshot of the DB as of the moment it began, and
+keeps reusing it for up to READ_STALENESS_SECONDS before starting a new
+one; the writer commits past it meanwhile.  Everything read in one
+session therefore comes from one snapshot, and no response is built from
+data older than the bound.  A reaper thread ends idle snapshots once
+they are past the bound, so they cannot hold back WAL checkpoints.
+
+Outside WAL (a rollback-journal reader would block the writer) and on
+non-SQLite databases there is no pinning: each session reads fresh.
+
+    with reads.session() as db:
+        rows = db.execute(...)
+        age = reads.age(db)         # seconds; see X-Snapshot-Age
+
+Odds history reads the pinned snapshot; per-user reads (a bettor's own
+positions) and the cached page rosters pass fresh=True, so they always
+include the bet just placed or the roster version they are cached under.
+Odds themselves come from the pool ledger, whose staleness is reported
+by app.api.ledger_headers() instead.
+READ_STALENESS_SECONDS=0 gives every session a fresh snapshot.
+"""
+
+import logging, os, sqlite3, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import sessionmaker
+from .models import SessionLocal, engine, sqlite_pragmas
+
+STALENESS = float(os.getenv("READ_STALENESS_SECONDS", "1.0"))
+POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "8"))
+
+log = logging.getLogger(__name__)
+
+
+class _SnapshotConnection(sqlite3.Connection):
+    # SQLAlchemy commits / rolls back on every session close and pool
+    # checkin, which would end the snapshot; ReadSnapshots ends it instead.
+    # Nothing to undo on a query_only connection.
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class ReadSnapshots:
+    def __init__(self, write_engine=engine, staleness=STALENESS, pool_size=POOL_SIZE):
+        self.staleness = staleness
+        self._lock = threading.Lock()
+        self._idle = {}             # checked-in dbapi connection -> its pool record
+        self._reaper = None
+        self._stop = threading.Event()
+        url = write_engine.url
+        if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+            self.engine = None
+            self._sessions = SessionLocal
+            return
+        path = Path(url.database).resolve()
+        pragmas = {k: v for k, v in sqlite_pragmas().items()
+                   if k not in ("journal_mode", "synchronous")}
+
+        def connect():
+            conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True,
+                                   factory=_SnapshotConnection, check_same_thread=False)
+            for name, value in pragmas.items():
+                conn.execute(f"PRAGMA {name}={value}")
+            conn.execute("PRAGMA query_only=1")
+            if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+                self.staleness = 0
+            return conn
+
+        self.engine = create_engine("sqlite://", creator=connect, future=True,
+                                    poolclass=QueuePool, pool_size=pool_size,
+                                    max_overflow=pool_size,
+                                    pool_reset_on_return=None)
+        event.listen(self.engine, "checkout", self._checkout)
+        event.listen(self.engine, "checkin", self._checkin)
+        self._sessions = sessionmaker(bind=self.engine, autoflush=False, future=True)
+
+    # ─── snapshot lifecycle (pool events) ──────────────────────────
+    @staticmethod
+    def _end(conn, record):
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        record.info.pop("snapshot_at", None)
+
+    @staticmethod
+    def _begin(conn, record):
+        conn.execute("BEGIN")
+        # a WAL read transaction takes its snapshot at the first read
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        record.info["snapshot_at"] = time.monotonic()
+
+    def _checkout(self, conn, record, _proxy):
+        with self._lock:
+            self._idle.pop(conn, None)
+            taken = record.info.get("snapshot_at")
+            if taken is not None and time.monotonic() - taken <= self.staleness:
+                return
+            self._end(conn, record)
+            self._begin(conn, record)
+        self._start_reaper()
+
+    def _checkin(self, conn, record):
+        if conn is None:
+            return                  # invalidated
+        with self._lock:
+            taken = record.info.get("snapshot_at")
+            if taken is None or time.monotonic() - taken > self.staleness:
+                self._end(conn, record)
+            else:
+                self._idle[conn] = record
+
+    def _start_reaper(self):
+        if self._reaper is not None or not self.staleness:
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="read-snapshots",
+                                                daemon=True)
+                self._reaper.start()
+
+    def _reap(self):
+        while not self._stop.wait(self.staleness):
+            now = time.monotonic()
+            with self._lock:
+                for conn, record in list(self._idle.items()):
+                    if now - record.info.get("snapshot_at", now) > self.staleness:
+                        try:
+                            self._end(conn, record)
+                        except sqlite3.Error:
+                            log.exception("ending an idle read snapshot failed")
+                        del self._idle[conn]
+
+    # ─── public ────────────────────────────────────────────────────
+    @contextmanager
+    def session(self, fresh=False):
+        """
+        A session on the read pool.  `fresh` starts a new snapshot, for
+        reads cached under a version that must not be older than it and
+        for a user's view of their own bets.
+        """
+        with self._sessions() as db:
+            if fresh and self.engine is not None:
+                conn = db.connection().connection
+                with self._lock:
+                    self._end(conn.dbapi_connection, conn)
+                    self._begin(conn.dbapi_connection, conn)
+            yield db
+
+    def age(self, session):
+        """Seconds since the snapshot `session` reads from was taken (0 when unpinned)."""
+        if self.engine is None:
+            return 0.0
+        taken = session.connection().connection.info.get("snapshot_at")
+        return 0.0 if taken is None else max(0.0, time.monotonic() - taken)
+
+    def headers(self, age):
+        """Response headers reporting a read's staleness and the configured bound."""
+        return {"X-Snapshot-Age": f"{age:.3f}", "X-Snapshot-Max-Age": f"{self.staleness:g}"}
+
+    def close(self):
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+        if self.engine is not None:
+            self.engine.dispose()
+
+
+reads = ReadSnapshots()
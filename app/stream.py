@@ -0,0 +1,95 @@
+"""
+Live odds push over Server-Sent Events.
+
+One `OddsBroadcaster` per worker process wakes every ODDS_TICK_SECONDS.
+For each watched market whose pool version moved, it computes the odds
+once from the pool ledger, diffs them against the previous tick and
+fans the delta out to every connected viewer.  Bets landing between
+ticks are coalesced, so the cost is at most one odds computation per
+market per tick no matter how many viewers are connected.
+
+Each stream opens with a `snapshot` event (full odds dict) followed by
+`delta` events: {"changed": {target_id: {...}}, "removed": [target_id]}.
+"""
+
+import asyncio, json, os
+from starlette.concurrency import run_in_threadpool
+from .ledger import ledger, MARKETS
+
+TICK_SECONDS = float(os.getenv("ODDS_TICK_SECONDS", "1.0"))
+KEEPALIVE_SECONDS = 15.0
+QUEUE_SIZE = 16      # deltas buffered per viewer before we resend a snapshot
+
+
+def _diff(old, new):
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = [k for k in old if k not in new]
+    if not changed and not removed:
+        return None
+    return {"changed": changed, "removed": removed}
+
+
+def _event(kind, data):
+    return f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class OddsBroadcaster:
+    def __init__(self, tick=TICK_SECONDS):
+        self.tick = tick
+        self.viewers = {m: set() for m in MARKETS}
+        self.current = {m: None for m in MARKETS}
+        self.versions = {m: None for m in MARKETS}
+        self._task = None
+
+    async def _odds(self, market):
+        # ledger reads may sync from the DB, so keep them off the event loop
+        return await run_in_threadpool(ledger.pool_odds, market)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            for market, viewers in self.viewers.items():
+                if not viewers:
+                    continue
+                version = await run_in_threadpool(ledger.version, market)
+                if version == self.versions[market]:
+                    continue        # no bets since the last tick
+                self.versions[market] = version
+                odds = await self._odds(market)
+                delta = _diff(self.current[market] or {}, odds)
+                self.current[market] = odds
+                if delta is None:
+                    continue
+                message = _event("delta", delta)
+                for q in viewers:
+                    if q.full():
+                        # slow viewer: drop its backlog and resync from scratch
+                        while not q.empty():
+                            q.get_nowait()
+                        q.put_nowait(_event("snapshot", odds))
+                    else:
+                        q.put_nowait(message)
+
+    async def stream(self, market):
+        """Async generator of SSE frames for one viewer of `market`."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if not self.viewers[market]:
+            # nobody was watching, so the last tick's odds may be stale
+            self.versions[market] = await run_in_threadpool(ledger.version, market)
+            self.current[market] = await self._odds(market)
+
+        q = asyncio.Queue(QUEUE_SIZE)
+        self.viewers[market].add(q)
+        try:
+            yield _event("snapshot", self.current[market])
+            while True:
+                try:
+                    yield await asyncio.wait_for(q.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.viewers[market].discard(q)
+
+
+broadcaster = OddsBroadcaster()
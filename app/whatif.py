@@ -0,0 +1,151 @@
+"""
+What-if payout matrices.
+
+For the win market every runner is a possible outcome; for props every
+(prop, side) is.  `PayoutMatrix` holds, for one market, what every bettor
+would be paid under every outcome, built in one vectorized pass over the
+per-bettor stakes with the arithmetic of app.payouts:
+
+    payout = bettor stake on outcome / stake on outcome * pool * (1 - HOUSE_TAKE)
+
+The matrix is sparse (a bettor only has cells for outcomes they backed),
+so it is stored as dict-of-dicts both ways round: outcome -> {email:
+payout} for "who gets paid what if X wins", and email -> {outcome:
+payout} for "what would I get".  Any scenario, bettor or single cell is
+one dict lookup.
+
+Matrices are cached per market and served as built, stamped with the
+ledger pool version they were built at.  Once the version has moved and
+the matrix is at least WHATIF_SECONDS old, the next read starts a
+rebuild on a background thread and keeps serving the old matrix until
+it lands, so during live betting a market rebuilds at most once per
+interval and readers never wait on it.  Only the very first read of a
+market builds synchronously.
+"""
+
+import logging, os, threading, time
+from sqlalchemy import select, func, literal
+from sqlalchemy.exc import OperationalError
+from .models import SessionLocal, AdvanceBet, WinBet, PropBet, BettorPosition
+from .ledger import ledger
+from .payouts import HOUSE_TAKE
+
+WHATIF_MARKETS = ("win", "prop")
+INTERVAL = float(os.getenv("WHATIF_SECONDS", "2"))     # min age before a rebuild
+
+log = logging.getLogger(__name__)
+
+
+def stake_frame(session, market):
+    """DataFrame (target_id, side_yes, bettor_email, stake), one row per position."""
+    import pandas as pd     # deferred: pandas alone is ~0.2 s of app start-up
+    cols = ["target_id", "side_yes", "bettor_email", "stake"]
+    rows = None
+    if session.bind.dialect.name == "sqlite":
+        try:
+            rows = session.execute(
+                select(BettorPosition.target_id, BettorPosition.side_yes,
+                       BettorPosition.bettor_email, BettorPosition.stake)
+                .where(BettorPosition.market == market, BettorPosition.n_bets > 0)
+            ).all()
+        except OperationalError:
+            session.rollback()      # bettor_positions not installed yet
+    if rows is None:
+        if market == "prop":
+            stmt = (select(PropBet.prop_id, PropBet.side_yes, PropBet.bettor_email,
+                           func.sum(PropBet.amount))
+                    .group_by(PropBet.prop_id, PropBet.side_yes, PropBet.bettor_email))
+        else:
+            model = AdvanceBet if market == "advance" else WinBet
+            stmt = (select(model.player_id, literal(False), model.bettor_email,
+                           func.sum(model.amount))
+                    .group_by(model.player_id, model.bettor_email))
+        rows = session.execute(stmt).all()
+    df = pd.DataFrame.from_records(rows, columns=cols)
+    df["stake"] = df["stake"].astype(float)
+    df["side_yes"] = df["side_yes"].astype(bool)
+    return df
+
+
+class PayoutMatrix:
+    """Sparse outcome x bettor payout matrix for one market at one pool version."""
+
+    def __init__(self, market, version, df):
+        import pandas as pd
+        self.market = market
+        self.version = version
+        self.built = time.monotonic()
+        net = 1.0 - HOUSE_TAKE
+        if market == "prop":
+            outcome = list(zip(df["target_id"], df["side_yes"]))
+            pool = df.groupby("target_id")["stake"].transform("sum")
+            backing = df.groupby(["target_id", "side_yes"])["stake"].transform("sum")
+        else:
+            outcome = list(df["target_id"])
+            pool = pd.Series(df["stake"].sum(), index=df.index)
+            backing = df.groupby("target_id")["stake"].transform("sum")
+        payout = (df["stake"] / backing * (pool * net)).round(2)
+
+        self.by_outcome, self.by_bettor, self.pools = {}, {}, {}
+        for key, email, amount, p, b in zip(outcome, df["bettor_email"], payout, pool, backing):
+            self.by_outcome.setdefault(key, {})[email] = float(amount)
+            self.by_bettor.setdefault(email, {})[key] = float(amount)
+            self.pools[key] = (float(p), float(b))
+
+    def scenario(self, outcome):
+        """{email: payout} if `outcome` wins; empty if nobody backed it."""
+        return self.by_outcome.get(outcome, {})
+
+    def bettor(self, email):
+        """{outcome: payout} for every outcome `email` backed."""
+        return self.by_bettor.get(email, {})
+
+    def pool(self, outcome):
+        """(pool, stake backing `outcome`) the scenario pays from."""
+        return self.pools.get(outcome, (0.0, 0.0))
+
+
+class WhatIf:
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self._locks = {m: threading.Lock() for m in WHATIF_MARKETS}   # held while building
+        self._matrices = {}
+
+    def _build(self, market):
+        # read the version first so the matrix is never older than it claims
+        version = ledger.version(market)
+        with SessionLocal() as db:
+            matrix = PayoutMatrix(market, version, stake_frame(db, market))
+        self._matrices[market] = matrix
+        return matrix
+
+    def _rebuild(self, market):
+        try:
+            self._build(market)
+        except Exception:
+            log.exception("what-if rebuild for %s failed", market)
+        finally:
+            self._locks[market].release()
+
+    def matrix(self, market):
+        """
+        Last built PayoutMatrix for `market` (see its `version`); kicks
+        off a background rebuild when that is behind the ledger and
+        older than `interval`.
+        """
+        if market not in WHATIF_MARKETS:
+            raise ValueError(f"no what-if matrix for market {market!r}")
+        cached = self._matrices.get(market)
+        if cached is None:
+            with self._locks[market]:
+                cached = self._matrices.get(market) or self._build(market)
+            return cached
+        if (cached.version != ledger.version(market)
+                and time.monotonic() - cached.built >= self.interval
+                and self._locks[market].acquire(blocking=False)):
+            threading.Thread(target=self._rebuild, args=(market,),
+                             name=f"whatif-{market}", daemon=True).start()
+        return cached
+
+
+whatif = WhatIf()
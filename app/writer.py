@@ -0,0 +1,227 @@
+"""
+Group-commit bet writer.
+
+Request handlers hand their bet to `bet_writer.place()`, which checks it
+with bet_errors(), queues it and blocks until the batch containing it
+has been committed.  A single background thread drains the queue and
+commits every BET_BATCH_MS milliseconds or every BET_BATCH_SIZE bets,
+whichever comes first, so a rush of bets pays for one SQLite fsync per
+batch instead of one per bet.
+
+Committed bets are applied to the pool ledger before the caller is
+released, so odds reads always include an acknowledged bet.
+
+With BET_JOURNAL_DIR set, `bet_writer` is an app.journal.JournalWriter
+instead: bets are acknowledged once journaled and projected into the DB
+asynchronously.
+"""
+
+import atexit, logging, math, os, queue, threading, time, uuid
+from concurrent.futures import Future
+from sqlalchemy import select, insert
+from .models import SessionLocal, Player, PropUniverse, AdvanceBet, WinBet, PropBet
+from .ledger import ledger
+
+BATCH_SIZE = int(os.getenv("BET_BATCH_SIZE", "64"))
+BATCH_MS = float(os.getenv("BET_BATCH_MS", "2"))
+JOURNAL_DIR = os.getenv("BET_JOURNAL_DIR")
+MODELS = {"advance": AdvanceBet, "win": WinBet, "prop": PropBet}
+
+log = logging.getLogger(__name__)
+
+
+def make_bet(market, target_id, amount, bettor_email, side_yes=None, bet_id=None):
+    """Build the ORM row for one bet; raises ValueError on an unknown market."""
+    ids = {"bet_id": bet_id} if bet_id else {}
+    if market == "advance":
+        return AdvanceBet(player_id=target_id, amount=amount, bettor_email=bettor_email, **ids)
+    if market == "win":
+        return WinBet(player_id=target_id, amount=amount, bettor_email=bettor_email, **ids)
+    if market == "prop":
+        return PropBet(prop_id=target_id, amount=amount, side_yes=bool(side_yes),
+                       bettor_email=bettor_email, **ids)
+    raise ValueError(f"unknown market {market!r}")
+
+
+def bet_errors(session, bets):
+    """
+    Why each (market, target_id, amount, side_yes) in `bets` cannot be
+    placed (None if it can): market, side, a finite amount > 0, and a
+    target that exists in that market.  One query per target table for
+    the whole list.
+    """
+    errors = [None] * len(bets)
+    targets = {"player": set(), "prop": set()}
+    for i, (market, target_id, amount, side_yes) in enumerate(bets):
+        if market not in ("advance", "win", "prop"):
+            errors[i] = "unknown market"
+        elif market == "prop" and side_yes is None:
+            errors[i] = "side_yes is required for prop bets"
+        elif not (math.isfinite(amount) and amount > 0):
+            errors[i] = "amount must be positive"
+        else:
+            targets["prop" if market == "prop" else "player"].add(str(target_id))
+    known = {"player": set(), "prop": set()}
+    if targets["player"]:
+        known["player"].update(session.scalars(select(Player.id)
+                                               .where(Player.id.in_(targets["player"]))))
+    if targets["prop"]:
+        known["prop"].update(session.scalars(select(PropUniverse.id)
+                                             .where(PropUniverse.id.in_(targets["prop"]))))
+    for i, (market, target_id, _, _) in enumerate(bets):
+        kind = "prop" if market == "prop" else "player"
+        if errors[i] is None and str(target_id) not in known[kind]:
+            errors[i] = "unknown target"
+    return errors
+
+
+class BetWriter:
+    def __init__(self, batch_size=BATCH_SIZE, batch_ms=BATCH_MS):
+        self.batch_size = batch_size
+        self.batch_delay = batch_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ─── producer side ───────────────────────────────────────────
+    def submit(self, market, target_id, amount, bettor_email, side_yes=None):
+        """
+        Queue one bet; the returned Future resolves once it is committed.
+        Raises ValueError for a bet bet_errors() or check() rejects.
+        """
+        result, = self.submit_many([(market, target_id, float(amount), side_yes)],
+                                   bettor_email)
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+
+    def submit_many(self, bets, bettor_email):
+        """
+        Validate (market, target_id, amount, side_yes) bets for one bettor
+        and queue the valid ones together, so they commit as one batch.
+        Returns, per bet, its Future or why it was rejected.
+        """
+        bets = [(market, str(target_id), float(amount), bettor_email, side_yes,
+                 str(uuid.uuid4())) for market, target_id, amount, side_yes in bets]
+        with SessionLocal() as db:
+            errors = bet_errors(db, [(m, t, a, s) for m, t, a, _, s, _ in bets])
+        results, items = [], []
+        for bet, error in zip(bets, errors):
+            if error is None:
+                try:
+                    self.check(bet)
+                except ValueError as exc:
+                    error = str(exc)
+            if error is None:
+                fut = Future()
+                items.append((bet, fut))
+                results.append(fut)
+            else:
+                results.append(error)
+        if items:
+            self._ensure_started()
+            self._queue.put(items)
+        return results
+
+    def check(self, bet):
+        """Raise ValueError for a bet this writer cannot take; see JournalWriter."""
+
+    def place(self, *args, **kwargs):
+        """submit() and wait until the bet is durable; re-raises DB errors."""
+        return self.submit(*args, **kwargs).result()
+
+    # ─── consumer side ───────────────────────────────────────────
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bet-writer",
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = list(item)
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._flush(batch)
+                    return
+                batch.extend(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        # commit + ledger update under commit_lock; see PoolLedger.sync()
+        with ledger.commit_lock:
+            try:
+                self._commit([bet for bet, _ in batch])
+            except Exception:
+                # one bad bet (e.g. amount <= 0) must not sink the whole batch
+                log.warning("batch of %d bets failed, retrying one by one", len(batch))
+                for bet, fut in batch:
+                    try:
+                        self._commit([bet])
+                    except Exception as exc:
+                        fut.set_exception(exc)
+                    else:
+                        self._done(bet, fut)
+                return
+            for bet, fut in batch:
+                self._done(bet, fut)
+
+    @staticmethod
+    def _commit(bets):
+        # one executemany per bet table; see make_bet() for the row layout
+        rows = {}
+        for market, target_id, amount, bettor_email, side_yes, bet_id in bets:
+            row = {"bet_id": bet_id, "amount": amount, "bettor_email": bettor_email}
+            if market == "prop":
+                row.update(prop_id=target_id, side_yes=bool(side_yes))
+            else:
+                row["player_id"] = target_id
+            rows.setdefault(market, []).append(row)
+        with SessionLocal() as db:
+            for market, market_rows in rows.items():
+                db.execute(insert(MODELS[market]), market_rows)
+            db.commit()
+
+    @staticmethod
+    def _done(bet, fut):
+        market, target_id, amount, _, side_yes, bet_id = bet
+        ledger.record(market, target_id, amount, side_yes, bet_id)
+        fut.set_result(None)
+
+    def lag(self):
+        """Acknowledged bets are already in the ledger; see JournalWriter.lag()."""
+        return 0.0
+
+    def recover(self):
+        """Nothing to replay: every acknowledged bet is already in the DB."""
+        return 0
+
+    def close(self):
+        """Drain the queue and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+if JOURNAL_DIR:
+    # imported here: app.journal builds on BetWriter above
+    from .journal import JournalWriter
+    bet_writer = JournalWriter(JOURNAL_DIR)
+else:
+    bet_writer = BetWriter()
+atexit.register(bet_writer.close)
@@ -9,6 +9,8 @@ create table players (
     dropped_out boolean not null default false,
     active      boolean not null default true
 );
+-- one row per roster entry; scripts/refresh_entities upserts on it
+create unique index ux_players_entry on players (player_name, heat, division);
 
 create table users (
     id            text primary key,
@@ -48,3 +50,130 @@ create table prop_bets (
     amount       real not null check(amount > 0),
     placed_at    datetime default current_timestamp
 );
+
+
+-- Covering indexes for the hot paths in app/odds.py, app/payouts.py and
+-- app/ledger.py: GROUP BY target + SUM(amount), target IN (...) settlement
+-- filters, and per-bettor lookups.  scripts/check_query_plans.py fails if
+-- any of those queries falls back to a plain table scan.
+create index ix_advance_bets_player on advance_bets (player_id, bettor_email, amount);
+create index ix_advance_bets_bettor on advance_bets (bettor_email);
+create index ix_win_bets_player     on win_bets (player_id, bettor_email, amount);
+create index ix_win_bets_bettor     on win_bets (bettor_email);
+create index ix_prop_bets_prop      on prop_bets (prop_id, side_yes, bettor_email, amount);
+create index ix_prop_bets_bettor    on prop_bets (bettor_email);
+
+-- Materialized stake per market / target, maintained by the triggers below
+-- in the same transaction as every bet insert.  side_yes is only
+-- meaningful for props (false for advance / win).
+-- Rebuild from the raw bet tables with: python -m scripts.reconcile_pool_totals
+create table pool_totals (
+    market    text    not null,     -- 'advance' | 'win' | 'prop'
+    target_id text    not null,     -- players.id or prop_universe.id
+    side_yes  boolean not null default false,
+    stake     real    not null default 0,
+    n_bets    integer not null default 0,
+    primary key (market, target_id, side_yes)
+);
+
+-- SQLite trigger syntax (on Postgres, refresh pool_totals with the reconcile script)
+create trigger advance_bets_pool_ins after insert on advance_bets begin
+    insert into pool_totals (market, target_id, side_yes, stake, n_bets)
+    values ('advance', new.player_id, false, new.amount, 1)
+    on conflict (market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger advance_bets_pool_del after delete on advance_bets begin
+    update pool_totals set stake = stake - old.amount, n_bets = n_bets - 1
+    where market = 'advance' and target_id = old.player_id and side_yes = false;
+end;
+
+create trigger win_bets_pool_ins after insert on win_bets begin
+    insert into pool_totals (market, target_id, side_yes, stake, n_bets)
+    values ('win', new.player_id, false, new.amount, 1)
+    on conflict (market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger win_bets_pool_del after delete on win_bets begin
+    update pool_totals set stake = stake - old.amount, n_bets = n_bets - 1
+    where market = 'win' and target_id = old.player_id and side_yes = false;
+end;
+
+create trigger prop_bets_pool_ins after insert on prop_bets begin
+    insert into pool_totals (market, target_id, side_yes, stake, n_bets)
+    values ('prop', new.prop_id, new.side_yes, new.amount, 1)
+    on conflict (market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger prop_bets_pool_del after delete on prop_bets begin
+    update pool_totals set stake = stake - old.amount, n_bets = n_bets - 1
+    where market = 'prop' and target_id = old.prop_id and side_yes = old.side_yes;
+end;
+
+-- Stake per bettor / market / target, maintained by triggers like
+-- pool_totals so a user's positions are read by primary-key prefix
+-- instead of scanning the bet tables.
+create table bettor_positions (
+    bettor_email text    not null,
+    market       text    not null,  -- 'advance' | 'win' | 'prop'
+    target_id    text    not null,
+    side_yes     boolean not null default false,
+    stake        real    not null default 0,
+    n_bets       integer not null default 0,
+    primary key (bettor_email, market, target_id, side_yes)
+);
+
+create trigger advance_bets_pos_ins after insert on advance_bets begin
+    insert into bettor_positions (bettor_email, market, target_id, side_yes, stake, n_bets)
+    values (new.bettor_email, 'advance', new.player_id, false, new.amount, 1)
+    on conflict (bettor_email, market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger advance_bets_pos_del after delete on advance_bets begin
+    update bettor_positions set stake = stake - old.amount, n_bets = n_bets - 1
+    where bettor_email = old.bettor_email and market = 'advance'
+      and target_id = old.player_id and side_yes = false;
+end;
+
+create trigger win_bets_pos_ins after insert on win_bets begin
+    insert into bettor_positions (bettor_email, market, target_id, side_yes, stake, n_bets)
+    values (new.bettor_email, 'win', new.player_id, false, new.amount, 1)
+    on conflict (bettor_email, market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger win_bets_pos_del after delete on win_bets begin
+    update bettor_positions set stake = stake - old.amount, n_bets = n_bets - 1
+    where bettor_email = old.bettor_email and market = 'win'
+      and target_id = old.player_id and side_yes = false;
+end;
+
+create trigger prop_bets_pos_ins after insert on prop_bets begin
+    insert into bettor_positions (bettor_email, market, target_id, side_yes, stake, n_bets)
+    values (new.bettor_email, 'prop', new.prop_id, new.side_yes, new.amount, 1)
+    on conflict (bettor_email, market, target_id, side_yes)
+    do update set stake = stake + excluded.stake, n_bets = n_bets + 1;
+end;
+
+create trigger prop_bets_pos_del after delete on prop_bets begin
+    update bettor_positions set stake = stake - old.amount, n_bets = n_bets - 1
+    where bettor_email = old.bettor_email and market = 'prop'
+      and target_id = old.prop_id and side_yes = old.side_yes;
+end;
+
+-- Change-only odds history: one row per market / target / side whose pool
+-- stake moved since the previous snapshot, at ts = unix seconds rounded
+-- down to the snapshot interval.  Written by app/history.py.
+create table odds_history (
+    market    text    not null,
+    target_id text    not null,
+    side_yes  boolean not null default false,
+    ts        integer not null,
+    stake     real    not null,
+    primary key (market, target_id, side_yes, ts)
+);
+create index ix_odds_history_market_ts on odds_history (market, ts);
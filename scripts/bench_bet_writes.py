@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Measure sustained bet inserts/sec: one commit per bet vs group commit vs journal.
+
+Spawns --clients threads that each place --bets bets, first through the
+old path (own session, add, commit), then through app.writer.bet_writer
+and then through an app.journal.JournalWriter (acknowledged once
+journaled; the time until every bet is projected into the DB is
+reported separately).
+
+    python -m scripts.bench_bet_writes --clients 32 --bets 200 --dir /data
+"""
+
+import os, argparse, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+ap.add_argument("--clients", type=int, default=32)
+ap.add_argument("--bets", type=int, default=200, help="bets per client")
+ap.add_argument("--dir", default=None,
+                help="where to put the DB (use a real disk, not tmpfs, for fsync costs)")
+args = ap.parse_args()
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-bench-", dir=args.dir))
+DB = TMP / "writes.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB}"
+
+from scripts.benchutil import seed_db
+from app.models import SessionLocal, AdvanceBet
+from app.writer import bet_writer
+from app.journal import JournalWriter
+
+_, _, ids = seed_db(DB, 0)
+PLAYER = ids["players"][0]
+journal = JournalWriter(TMP / "journal")
+
+
+def per_bet_commit(i):
+    for _ in range(args.bets):
+        with SessionLocal() as db:
+            db.add(AdvanceBet(player_id=PLAYER, amount=1.0, bettor_email=f"c{i}@bwater.com"))
+            db.commit()
+
+
+def group_commit(i):
+    for _ in range(args.bets):
+        bet_writer.place("advance", PLAYER, 1.0, f"c{i}@bwater.com")
+
+
+def journaled(i):
+    for _ in range(args.bets):
+        journal.place("advance", PLAYER, 1.0, f"c{i}@bwater.com")
+
+
+def run(label, fn):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(fn, range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    n = args.clients * args.bets
+    print(f"{label:<16} {n:>7} bets  {elapsed:7.2f}s  {n / elapsed:9.0f} bets/s")
+
+
+if __name__ == "__main__":
+    run("per-bet commit", per_bet_commit)
+    run("group commit", group_commit)
+    t0 = time.perf_counter()
+    run("journal (ack)", journaled)
+    journal.close()
+    n = args.clients * args.bets
+    print(f"{'journal (in DB)':<16} {n:>7} bets  {time.perf_counter() - t0:7.2f}s")
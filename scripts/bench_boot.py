@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-request of a container boot.
+
+Copies a seeded SQLite DB, starts a boot command against it and polls
+GET /api/ready until it answers 200, for:
+
+    chain   the old Dockerfile CMD: four migration processes, then python -m app
+    cold    python -m scripts.boot on a DB without a boot fingerprint
+    warm    python -m scripts.boot again, nothing changed
+
+    python -m scripts.bench_boot --bets 100000 --repeat 3
+"""
+
+import os, argparse, shutil, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+import httpx
+
+from scripts.benchutil import seed_db
+
+CHAIN = ("python -m scripts.refresh_entities && python -m scripts.migrate_users && "
+         "python -m scripts.migrate_indexes && python -m scripts.reconcile_pool_totals "
+         "--install && python -m app --port {port}")
+
+
+def time_to_ready(cmd, env, port, timeout=120):
+    """Seconds from spawning `cmd` until /api/ready answers 200."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/ready").status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.TransportError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError(f"{cmd} exited with {proc.returncode}")
+            time.sleep(0.02)
+        raise RuntimeError("server did not become ready")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def fresh_copy(src, dst):
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{dst}{suffix}").unlink(missing_ok=True)
+    shutil.copyfile(src, dst)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--bets", type=int, default=10_000, help="bets per market to seed")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--port", type=int, default=8791)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="bwets-boot-"))
+    seed, db = tmp / "seed.db", tmp / "boot.db"
+    engine, _, _ = seed_db(seed, args.bets)
+    engine.dispose()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db}", ROSTER_STAMP=str(tmp / "roster.stamp"))
+    boot = [sys.executable, "-m", "scripts.boot", "--", "--port", str(args.port)]
+    chain = ["bash", "-c", CHAIN.format(port=args.port)]
+
+    results = {"chain": [], "cold": [], "warm": []}
+    for _ in range(args.repeat):
+        fresh_copy(seed, db)
+        results["chain"].append(time_to_ready(chain, env, args.port))
+        fresh_copy(seed, db)
+        results["cold"].append(time_to_ready(boot, env, args.port))
+        results["warm"].append(time_to_ready(boot, env, args.port))
+
+    print(f"{args.bets:,} bets per market, median of {args.repeat}:")
+    for name, times in results.items():
+        print(f"  {name:<6} {statistics.median(times):6.2f}s  (min {min(times):.2f}s)")
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
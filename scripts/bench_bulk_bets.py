@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare POST /api/bet (one bet per request) with POST /api/bets (bulk).
+
+Starts the app under uvicorn against a temp SQLite DB, signs up one
+user per client (the bet endpoints take the bettor from the session)
+and posts --bets bets each way from --clients concurrent HTTP clients.
+
+    python -m scripts.bench_bulk_bets --bets 5000 --batch 500
+"""
+
+import os, argparse, random, subprocess, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import httpx
+
+from scripts.benchutil import seed_db
+from scripts.bench_server import wait_up
+
+PORT = 8765
+PASSWORD = "bench-pw"
+
+
+def logged_in(base, email):
+    """An httpx.Client holding a session cookie for a freshly registered `email`."""
+    client = httpx.Client(base_url=base, follow_redirects=False, timeout=30)
+    creds = {"email": email, "password": PASSWORD}
+    client.post("/register", data={**creds, "confirm_password": PASSWORD})
+    if client.post("/login", data=creds).status_code != 302:
+        raise RuntimeError(f"could not log in as {email}")
+    return client
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--bets", type=int, default=5_000)
+    ap.add_argument("--batch", type=int, default=500, help="bets per POST /bets")
+    ap.add_argument("--clients", type=int, default=8)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bwets-bench-"))
+    _, _, ids = seed_db(tmp / "bulk.db", 0)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp / 'bulk.db'}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.asgi:application", "--port", str(PORT),
+         "--log-level", "warning"], env=env)
+    base = f"http://127.0.0.1:{PORT}"
+    try:
+        wait_up(base)
+        clients = [logged_in(base, f"bench{i}@bwater.com") for i in range(args.clients)]
+
+        rnd = random.Random(0)
+        bets = [{"market": "win", "target_id": rnd.choice(ids["players"]),
+                 "amount": round(rnd.uniform(1, 100), 2)} for _ in range(args.bets)]
+
+        def post_all(client, path, payloads):
+            for p in payloads:
+                client.post(path, json=p).raise_for_status()
+
+        def run(label, path, payloads):
+            shards = [payloads[i::args.clients] for i in range(args.clients)]
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                list(pool.map(lambda c, s: post_all(c, path, s), clients, shards))
+            elapsed = time.perf_counter() - t0
+            print(f"{label:<22} {args.bets:>7} bets  {elapsed:7.2f}s  "
+                  f"{args.bets / elapsed:9.0f} bets/s")
+
+        run("POST /bet (single)", "/api/bet", bets)
+        run(f"POST /bets (x{args.batch})", "/api/bets",
+            [bets[i:i + args.batch] for i in range(0, len(bets), args.batch)])
+        for client in clients:
+            client.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
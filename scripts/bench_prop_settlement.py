@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark prop settlement as the number of props grows.
+
+For each prop count, seeds a temp DB and settles every prop with
+app.payouts.calculate_prop_payouts and with the old three-queries-per-prop
+loop, printing SQL statement counts (per run) and the best wall time of
+--repeat runs for both.  The payouts must match to the cent.
+
+    python -m scripts.bench_prop_settlement --props 10 100 500 1000
+"""
+
+import os, argparse, random, tempfile
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-bench-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP / 'unused.db'}")
+
+from sqlalchemy import select, func
+from app.models import PropBet
+from app.payouts import calculate_prop_payouts, HOUSE_TAKE
+from scripts.benchutil import seed_db, count_queries, best_of
+
+
+def per_prop_baseline(session, prop_results):
+    """The pre-batching implementation: three queries for every prop."""
+    payouts = {}
+    for prop_id, yes_won in prop_results.items():
+        total_pool = session.scalar(
+            select(func.sum(PropBet.amount)).where(PropBet.prop_id == prop_id)) or 0.0
+        if total_pool <= 0:
+            continue
+        winning_stake = session.scalar(
+            select(func.sum(PropBet.amount))
+            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)) or 0.0
+        if winning_stake <= 0:
+            continue
+        for email, amount in session.execute(
+            select(PropBet.bettor_email, PropBet.amount)
+            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)
+        ):
+            payout = (amount / winning_stake) * (total_pool * (1.0 - HOUSE_TAKE))
+            payouts[email] = payouts.get(email, 0.0) + payout
+    return {email: round(amount, 2) for email, amount in payouts.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--props", type=int, nargs="+", default=[10, 100, 500, 1000])
+    ap.add_argument("--bets", type=int, default=100_000, help="prop bets in the DB")
+    ap.add_argument("--repeat", type=int, default=3, help="report the fastest of this many runs")
+    args = ap.parse_args()
+
+    print(f"{'props':>6} {'batched q':>10} {'batched s':>10} {'per-prop q':>11} {'per-prop s':>11}")
+    for n_props in args.props:
+        engine, Session, ids = seed_db(TMP / f"props-{n_props}.db", args.bets,
+                                       n_props=n_props)
+        rnd = random.Random(n_props)
+        results = {p: rnd.random() < 0.5 for p in ids["props"]}
+
+        with Session() as db, count_queries(engine) as q_new:
+            new, t_new = best_of(args.repeat, calculate_prop_payouts, db, results)
+        with Session() as db, count_queries(engine) as q_old:
+            old, t_old = best_of(args.repeat, per_prop_baseline, db, results)
+
+        mismatched = sum(new.get(e) != old.get(e) for e in set(new) | set(old))
+        assert not mismatched, f"{mismatched} bettors are paid a different amount"
+        print(f"{n_props:>6} {q_new[0] // args.repeat:>10} {t_new:>10.3f} {q_old[0] // args.repeat:>11} {t_old:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
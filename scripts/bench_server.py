@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Requests/sec of `python -m app` with 1, 2 and 4 uvicorn workers.
+
+Each run starts the production server against a seeded temp SQLite DB
+and hammers GET / (Flask) and GET /api/odds/win (FastAPI) from
+--clients keep-alive connections for --seconds.
+
+    python -m scripts.bench_server --workers 1 2 4 --clients 50
+"""
+
+import os, argparse, subprocess, sys, tempfile, threading, time
+from pathlib import Path
+import httpx
+
+from scripts.benchutil import seed_db
+
+PATHS = ("/", "/api/odds/win")
+
+
+def wait_up(base, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base + "/api/ready").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not come up")
+
+
+def hammer(base, clients, seconds):
+    counts = [0] * clients
+    stop = time.monotonic() + seconds
+
+    def client(i):
+        with httpx.Client(base_url=base) as c:
+            n = 0
+            while time.monotonic() < stop:
+                c.get(PATHS[n % len(PATHS)]).raise_for_status()
+                n += 1
+            counts[i] = n
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--bets", type=int, default=10_000)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bwets-bench-"))
+    seed_db(tmp / "server.db", args.bets)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp / 'server.db'}")
+
+    print(f"cpus={os.cpu_count()} clients={args.clients} seconds={args.seconds}")
+    for i, workers in enumerate(args.workers):
+        port = 8780 + i
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app", "--workers", str(workers), "--port", str(port)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_up(base)
+            print(f"workers={workers}  {hammer(base, args.clients, args.seconds):8.0f} req/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark app.settlement.settle against app.payouts.
+
+Seeds a temporary SQLite DB, settles it with both code paths, checks the
+results agree to the cent and prints the best wall time of --repeat
+runs for each.
+
+    python -m scripts.bench_settlement --bets 1000000
+"""
+
+import os, argparse, random, tempfile
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-bench-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP / 'unused.db'}")
+
+from app.payouts import calculate_all_payouts, get_payout_summary
+from app.settlement import settle
+from scripts.benchutil import seed_db, best_of
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--bets", type=int, default=100_000, help="bets per market")
+    ap.add_argument("--repeat", type=int, default=3, help="report the fastest of this many runs")
+    ap.add_argument("--skip-legacy", action="store_true",
+                    help="only time settle() (legacy path is slow at 1M+)")
+    args = ap.parse_args()
+
+    engine, Session, ids = seed_db(TMP / "bench.db", args.bets)
+    rnd = random.Random(1)
+    results = {
+        "advance_winners": rnd.sample(ids["players"], 20),
+        "win_winner": ids["players"][0],
+        "prop_results": {p: rnd.random() < 0.5 for p in ids["props"]},
+    }
+
+    with Session() as db:
+        (payouts, summary), t_new = best_of(args.repeat, settle, db, results)
+    print(f"settle():                {t_new:8.2f}s  {len(payouts)} bettors")
+
+    if args.skip_legacy:
+        return
+    with Session() as db:
+        legacy, t_old = best_of(args.repeat, lambda: (calculate_all_payouts(db, results),
+                                                      get_payout_summary(db, results)))
+    print(f"payouts.* (both calls):  {t_old:8.2f}s")
+
+    assert legacy[0] == payouts, "total payouts differ"
+    for market, section in legacy[1]["market_breakdown"].items():
+        assert section == summary["market_breakdown"][market], f"{market} differs"
+    print("results identical to the cent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare mixed read/write throughput across the SQLite storage profiles.
+
+For each profile in app.models.SQLITE_PROFILES, seeds a fresh DB, then for
+--seconds runs --readers threads computing advance odds with the SQL in
+app.odds alongside --writers threads committing one bet at a time.
+Prints reads/s, writes/s and how many operations failed with
+"database is locked".
+
+    python -m scripts.bench_storage --readers 8 --writers 4 --seconds 10 --dir /data
+"""
+
+import os, argparse, tempfile, threading, time
+from pathlib import Path
+
+ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+ap.add_argument("--profiles", nargs="+", default=None, help="default: every profile")
+ap.add_argument("--readers", type=int, default=8)
+ap.add_argument("--writers", type=int, default=4)
+ap.add_argument("--seconds", type=float, default=10.0)
+ap.add_argument("--bets", type=int, default=100_000, help="bets per market to seed")
+ap.add_argument("--dir", default=None,
+                help="where to put the DB (use a real disk, not tmpfs, for fsync costs)")
+args = ap.parse_args()
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-bench-", dir=args.dir))
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP / 'unused.db'}"
+
+from sqlalchemy.exc import OperationalError
+from app.models import AdvanceBet, SQLITE_PROFILES, apply_storage_profile
+from app.odds import pool_odds
+from scripts.benchutil import seed_db
+
+
+def run(profile):
+    engine, Session, ids = seed_db(TMP / f"{profile}.db", args.bets)
+    apply_storage_profile(engine, profile)
+    engine.pool.dispose()               # seed connections predate the listener
+    player = ids["players"][0]
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + args.seconds
+
+    def tally(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while time.monotonic() < stop:
+            try:
+                with Session() as db:
+                    pool_odds(db, AdvanceBet, AdvanceBet.player_id)
+                tally("reads")
+            except OperationalError:
+                tally("locked")
+
+    def writer(i):
+        while time.monotonic() < stop:
+            try:
+                with Session() as db:
+                    db.add(AdvanceBet(player_id=player, amount=1.0,
+                                      bettor_email=f"w{i}@bwater.com"))
+                    db.commit()
+                tally("writes")
+            except OperationalError:
+                tally("locked")
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+    print(f"{profile:<10} {counts['reads'] / elapsed:9.1f} reads/s "
+          f"{counts['writes'] / elapsed:9.1f} writes/s {counts['locked']:7d} locked")
+
+
+if __name__ == "__main__":
+    print(f"{args.readers} readers + {args.writers} writers, {args.seconds:g}s per profile, "
+          f"{args.bets:,} bets per market\n")
+    for profile in args.profiles or SQLITE_PROFILES:
+        run(profile)
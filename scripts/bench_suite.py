@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the odds and payout functions.
+
+For every --sizes entry (total bets, split evenly over the three markets)
+seeds a temp SQLite DB with 150 players, 50 props and one bettor per ~50
+bets, then times every function in app.odds and app.payouts plus
+app.settlement.settle, counting the SQL statements each one issues.
+Results go to a JSON file; with --baseline, any function that got more
+than --tolerance slower (or issues more statements) than in the baseline
+file makes the run exit 1.
+
+scripts/bench_baseline.json is the committed baseline (10k / 100k / 1M,
+environment recorded in the file).  Timings only compare on the machine
+that wrote the baseline, so the timing check is manual: run it before and
+after a change and regenerate the baseline when a change is meant to
+move the numbers.  Statement counts don't depend on the machine, and CI
+checks those alone (--statements-only) at 10k on every push.
+
+    python -m scripts.bench_suite --sizes 10k 100k 1M --out scripts/bench_baseline.json
+    python -m scripts.bench_suite --sizes 10k 100k --baseline scripts/bench_baseline.json
+    python -m scripts.bench_suite --sizes 10k --repeat 1 --statements-only \
+        --baseline scripts/bench_baseline.json
+"""
+
+import os, argparse, json, platform, random, sqlite3, statistics, subprocess, sys, \
+    tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-bench-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP / 'unused.db'}")
+
+from app.models import AdvanceBet, WinBet, PropBet
+from app.odds import pool_odds, prop_odds
+from app import payouts
+from app.settlement import settle
+from scripts.benchutil import seed_db
+
+N_PLAYERS, N_PROPS = 150, 50
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def cases(ids, rnd):
+    """(name, fn(session)) for every function under test."""
+    results = {
+        "advance_winners": rnd.sample(ids["players"], 20),
+        "win_winner": ids["players"][0],
+        "prop_results": {p: rnd.random() < 0.5 for p in ids["props"]},
+    }
+    return [
+        ("odds.pool_odds[advance]", lambda db: pool_odds(db, AdvanceBet, AdvanceBet.player_id)),
+        ("odds.pool_odds[win]",     lambda db: pool_odds(db, WinBet, WinBet.player_id)),
+        ("odds.pool_odds[prop]",    lambda db: pool_odds(db, PropBet, PropBet.prop_id)),
+        ("odds.prop_odds",          prop_odds),
+        ("payouts.calculate_advance_payouts",
+         lambda db: payouts.calculate_advance_payouts(db, results["advance_winners"])),
+        ("payouts.calculate_win_payouts",
+         lambda db: payouts.calculate_win_payouts(db, results["win_winner"])),
+        ("payouts.calculate_prop_payouts",
+         lambda db: payouts.calculate_prop_payouts(db, results["prop_results"])),
+        ("payouts.calculate_all_payouts", lambda db: payouts.calculate_all_payouts(db, results)),
+        ("payouts.get_payout_summary",    lambda db: payouts.get_payout_summary(db, results)),
+        ("settlement.settle",             lambda db: settle(db, results)),
+    ]
+
+
+def measure(Session, fn, repeat):
+    """(seconds per run, statements per run) for fn(session)."""
+    times, statements = [], 0
+    for _ in range(repeat):
+        with Session() as db:
+            # trace the raw sqlite3 connection so DBAPI-level reads
+            # (app.settlement) are counted too
+            raw = db.connection().connection.driver_connection
+            seen = []
+            raw.set_trace_callback(seen.append)
+            t0 = time.perf_counter()
+            try:
+                fn(db)
+            finally:
+                elapsed = time.perf_counter() - t0
+                raw.set_trace_callback(None)
+        times.append(elapsed)
+        statements = len(seen)
+    return times, statements
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+    }
+
+
+def regressions(results, baseline, tolerance, timings=True):
+    """Human-readable lines for every case slower / chattier than baseline."""
+    old = {(r["bets"], r["function"]): r for r in baseline["results"]}
+    found = []
+    for r in results:
+        b = old.get((r["bets"], r["function"]))
+        if b is None:
+            continue
+        if timings and r["median_s"] > b["median_s"] * (1 + tolerance):
+            found.append(f"{r['function']} @ {r['bets']:,}: "
+                         f"{b['median_s']:.4f}s -> {r['median_s']:.4f}s")
+        if r["statements"] > b["statements"]:
+            found.append(f"{r['function']} @ {r['bets']:,}: "
+                         f"{b['statements']} -> {r['statements']} statements")
+    return found
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sizes", nargs="+", type=parse_size,
+                    default=[10_000, 100_000, 1_000_000, 10_000_000],
+                    help="total bets per run, e.g. 10k 100k 1M 10M")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per function (median kept)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=None, help="earlier --out file to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument("--statements-only", action="store_true",
+                    help="compare statement counts only (timings from another machine)")
+    args = ap.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        per_market = size // 3
+        t0 = time.perf_counter()
+        engine, Session, ids = seed_db(TMP / f"suite-{size}.db", per_market,
+                                       n_players=N_PLAYERS, n_props=N_PROPS,
+                                       n_users=max(200, size // 50))
+        print(f"\n{size:,} bets ({per_market:,} per market), "
+              f"seeded in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        for name, fn in cases(ids, random.Random(1)):
+            times, statements = measure(Session, fn, args.repeat)
+            row = {
+                "bets": size,
+                "function": name,
+                "median_s": round(statistics.median(times), 6),
+                "min_s": round(min(times), 6),
+                "statements": statements,
+            }
+            results.append(row)
+            print(f"  {name:<36} {row['median_s']:9.4f}s  {statements:5d} stmts",
+                  file=sys.stderr)
+        engine.dispose()
+        os.remove(TMP / f"suite-{size}.db")
+
+    report = {"environment": environment(),
+              "config": {"players": N_PLAYERS, "props": N_PROPS, "repeat": args.repeat},
+              "results": results}
+    Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nwrote {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()),
+                            args.tolerance, timings=not args.statements_only)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
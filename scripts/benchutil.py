@@ -0,0 +1,89 @@
+"""
+Shared helpers for the scripts/bench_*.py benchmarks.
+
+▪ seed_db() builds a throw-away SQLite file from schema.sql and fills it
+  with random players, props and bets using plain executemany
+▪ count_queries() counts the SQL statements an engine issues
+▪ timed() / best_of() time a call
+"""
+
+import os, random, sqlite3, uuid, time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / "schema.sql"
+
+
+def seed_db(path, n_bets, n_players=150, n_props=50, n_users=2_000, seed=0):
+    """
+    Create `path` from schema.sql and insert `n_bets` bets per market.
+
+    Returns (engine, Session, ids) where ids holds the player / prop ids.
+    """
+    # WAL-mode files leave -wal / -shm siblings that would be replayed
+    # into the new database
+    for stale in (f"{path}", f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL.read_text())
+
+    players = [str(uuid.uuid4()) for _ in range(n_players)]
+    props = [str(uuid.uuid4()) for _ in range(n_props)]
+    emails = [f"user{i}@bwater.com" for i in range(n_users)]
+    conn.executemany(
+        "insert into players (id, player_name, heat, division) values (?, ?, ?, ?)",
+        [(pid, f"Runner {i}", i % 10, f"Div {i % 3}") for i, pid in enumerate(players)])
+    conn.executemany(
+        "insert into prop_universe (id, prop_name) values (?, ?)",
+        [(pid, f"Prop {i}") for i, pid in enumerate(props)])
+
+    def bets(choices, with_side=False):
+        for _ in range(n_bets):
+            row = (str(uuid.uuid4()), rnd.choice(choices), rnd.choice(emails),
+                   round(rnd.uniform(1, 250), 2))
+            yield row + (rnd.random() < 0.5,) if with_side else row
+
+    conn.executemany("insert into advance_bets (bet_id, player_id, bettor_email, amount) "
+                     "values (?, ?, ?, ?)", bets(players))
+    conn.executemany("insert into win_bets (bet_id, player_id, bettor_email, amount) "
+                     "values (?, ?, ?, ?)", bets(players))
+    conn.executemany("insert into prop_bets (bet_id, prop_id, bettor_email, amount, side_yes) "
+                     "values (?, ?, ?, ?, ?)", bets(props, with_side=True))
+    conn.commit()
+    conn.close()
+
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    return engine, Session, {"players": players, "props": props, "emails": emails}
+
+
+@contextmanager
+def count_queries(engine):
+    """Yield a one-item list holding the number of statements executed so far."""
+    counter = [0]
+
+    def _count(*_):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+
+def timed(fn, *args, **kwargs):
+    """Return (result, seconds)."""
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def best_of(n, fn, *args, **kwargs):
+    """(result, fastest of `n` runs), so a cold page cache does not decide a comparison."""
+    runs = [timed(fn, *args, **kwargs) for _ in range(n)]
+    return runs[-1][0], min(t for _, t in runs)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Single container boot path: prepare the DB, then serve.
+
+Runs, in this one process, what the Dockerfile used to chain as four:
+
+▪ refresh_entities      (players / props from the CSVs)
+▪ migrate_users         (users table, bettor_email columns)
+▪ migrate_indexes       (covering indexes on the bet tables)
+▪ reconcile_pool_totals --install   (aggregate tables + triggers)
+
+plus the odds_history table, which /api/odds/*/history reads even with
+HISTORY_SECONDS=0 (app/history.py only creates it when snapshotting).
+
+All of it runs only when the boot fingerprint changed: a sha256 of
+players.csv, props.csv, schema.sql, app/models.py, the migration scripts
+and this one, stored in the DB's boot_state table after a successful
+run.  An unchanged restart goes straight to `python -m app`; --force
+runs every step regardless.  A changed fingerprint can mean a full
+index build + ANALYZE before the server listens, hence fly.toml's
+health-check grace period.
+
+    python -m scripts.boot [--force] [-- app args, e.g. --workers 2]
+"""
+
+import argparse, hashlib, logging, time
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.models import engine, OddsHistory
+from scripts import refresh_entities, migrate_users, migrate_indexes
+from scripts.reconcile_pool_totals import ensure_aggregates, rebuild
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
+
+SCRIPTS = Path(__file__).parent
+INPUTS = (
+    Path(refresh_entities.PLAYERS_CSV),
+    Path(refresh_entities.PROPS_CSV),
+    Path(refresh_entities.SCHEMA_SQL),
+    SCRIPTS.parent / "app" / "models.py",       # migrate_* build indexes / columns from it
+    *(SCRIPTS / f"{name}.py" for name in ("refresh_entities", "migrate_users",
+                                          "migrate_indexes", "reconcile_pool_totals",
+                                          "boot")),
+)
+
+
+def fingerprint() -> str:
+    h = hashlib.sha256()
+    for path in INPUTS:
+        h.update(path.name.encode() + b"\0")
+        h.update(path.read_bytes() if path.exists() else b"")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def stored_fingerprint():
+    if engine.dialect.name == "sqlite" and not refresh_entities.DB_FILE.exists():
+        return None
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "select value from boot_state where key = 'fingerprint'")).scalar()
+    except OperationalError:
+        return None             # fresh DB, or one from before boot_state
+
+
+def prepare(fp) -> None:
+    refresh_entities.main()
+    migrate_users.migrate()
+    migrate_indexes.migrate()
+    OddsHistory.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        created = ensure_aggregates(conn)
+        if created:
+            rebuild(conn, created)
+            logging.info("🔄  %s rebuilt from the bet tables", ", ".join(created))
+        conn.execute(text("create table if not exists boot_state "
+                          "(key text primary key, value text not null)"))
+        conn.execute(text("delete from boot_state where key = 'fingerprint'"))
+        conn.execute(text("insert into boot_state (key, value) values ('fingerprint', :fp)"),
+                     {"fp": fp})
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--force", action="store_true", help="run every step even if unchanged")
+    ap.add_argument("app_args", nargs=argparse.REMAINDER,
+                    help="passed on to python -m app (after --)")
+    args = ap.parse_args(argv)
+    app_args = args.app_args[1:] if args.app_args[:1] == ["--"] else args.app_args
+
+    t0 = time.perf_counter()
+    fp = fingerprint()
+    if not args.force and stored_fingerprint() == fp:
+        logging.info("⏭️  CSVs and schema unchanged (%s); skipping refresh", fp[:12])
+    else:
+        prepare(fp)
+    logging.info("🚀  DB ready in %.2fs; starting the app", time.perf_counter() - t0)
+
+    from app import main as serve
+    serve(app_args)
+
+
+if __name__ == "__main__":
+    main()
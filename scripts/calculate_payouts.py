@@ -4,12 +4,21 @@ Example script showing how to calculate payouts for the betting system.
 
 This script demonstrates how to use the payouts module to calculate
 winnings for users based on event results.
+
+With --format it instead streams the settlement for a results file
+(JSON in the calculate_all_payouts shape) as CSV or JSON Lines, one row
+per winning bettor, without holding every bettor in memory:
+
+    python -m scripts.calculate_payouts --results results.json --format csv --out payouts.csv
 """
 
 import os
+import sys
+import json
+import argparse
 from dotenv import load_dotenv
 from app.models import SessionLocal
-from app.payouts import calculate_all_payouts, get_payout_summary
+from app.settlement import settle, stream_payouts, export_lines, EXPORT_FORMATS
 
 load_dotenv()
 
@@ -37,11 +46,8 @@ def example_payout_calculation():
     }
     
     with SessionLocal() as db:
-        # Calculate all payouts
-        payouts = calculate_all_payouts(db, results)
-        
-        # Get detailed summary
-        summary = get_payout_summary(db, results)
+        # Calculate all payouts and the detailed summary in one pass
+        payouts, summary = settle(db, results)
         
         # Print results
         print("🏆 PAYOUT CALCULATION RESULTS")
@@ -100,7 +106,30 @@ def calculate_specific_market_payouts():
         for email, amount in advance_payouts.items():
             print(f"  {email}: ${amount:.2f}")
 
+def export_payouts(results_path, fmt, out_path=None):
+    """Stream the settlement for `results_path` to `out_path` (or stdout)."""
+    with open(results_path) as f:
+        results = json.load(f)
+    out = open(out_path, "w", newline="") if out_path else sys.stdout
+    try:
+        with SessionLocal() as db:
+            out.writelines(export_lines(stream_payouts(db, results), fmt))
+    finally:
+        if out_path:
+            out.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculate or export event payouts")
+    parser.add_argument("--results", help="JSON file with advance_winners / win_winner / prop_results")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="stream an export instead of the demo")
+    parser.add_argument("--out", help="export file (default: stdout)")
+    args = parser.parse_args()
+    if args.format:
+        if not args.results:
+            parser.error("--format needs --results")
+        export_payouts(args.results, args.format, args.out)
+        sys.exit(0)
+
     print("🎲 Betting Payout Calculator")
     print("This script demonstrates payout calculations for the parimutuel betting system.")
     print("\nNote: Replace the example player IDs and prop IDs with actual results from your event.")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the bet-table hot paths.
+
+Seeds a temp DB from schema.sql, runs the odds, ledger and settlement
+code paths against it while recording every SQL statement they issue,
+then EXPLAIN QUERY PLANs each one.  Exits 1 if any statement reads a
+bet table with a plain table SCAN (no index) or needs a temp B-tree for
+its GROUP BY, i.e. if a covering index from schema.sql stopped being used.
+
+    python -m scripts.check_query_plans [-v]
+"""
+
+import os, re, sys, argparse, tempfile
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-plans-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP / 'unused.db'}")
+
+from sqlalchemy import event, select
+from app.models import AdvanceBet, WinBet, PropBet
+from app.odds import pool_odds, prop_odds
+from app.payouts import calculate_all_payouts
+from app.ledger import PoolLedger
+from scripts.benchutil import seed_db
+
+BET_TABLES = {"advance_bets", "win_bets", "prop_bets"}
+PLAIN_SCAN = re.compile(r"^SCAN (\w+)$")
+TEMP_GROUP = re.compile(r"USE TEMP B-TREE FOR (GROUP|ORDER) BY")
+
+# app.settlement streams these through a raw DBAPI cursor, which the
+# statement recorder cannot see
+SETTLEMENT = [
+    select(AdvanceBet.player_id, AdvanceBet.bettor_email, AdvanceBet.amount),
+    select(WinBet.player_id, WinBet.bettor_email, WinBet.amount),
+    select(PropBet.prop_id, PropBet.side_yes, PropBet.bettor_email, PropBet.amount),
+]
+
+
+def capture(engine, session, ids):
+    """Run the hot paths and return [(sql, params)] in execution order."""
+    seen = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        pool_odds(session, AdvanceBet, AdvanceBet.player_id)
+        pool_odds(session, WinBet, WinBet.player_id)
+        pool_odds(session, PropBet, PropBet.prop_id)
+        prop_odds(session)
+
+        ledger = PoolLedger(sync_seconds=1.0)
+        ledger.rebuild(session)
+        ledger.load(session)
+        ledger.sync(session)
+
+        calculate_all_payouts(session, {
+            "advance_winners": ids["players"][:10],
+            "win_winner": ids["players"][0],
+            "prop_results": {p: i % 2 == 0 for i, p in enumerate(ids["props"])},
+        })
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    dialect = engine.dialect
+    seen += [(str(stmt.compile(dialect=dialect)), ()) for stmt in SETTLEMENT]
+    return seen
+
+
+def problems(plan):
+    """Offending plan lines for one statement."""
+    bad = []
+    for detail in plan:
+        m = PLAIN_SCAN.match(detail)
+        if m and m.group(1) in BET_TABLES:
+            bad.append(detail)
+        elif TEMP_GROUP.search(detail):
+            bad.append(detail)
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--bets", type=int, default=2_000, help="bets per market to seed")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = ap.parse_args(argv)
+
+    engine, Session, ids = seed_db(str(TMP / "plans.db"), args.bets)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+
+    failed = 0
+    with Session() as session:
+        statements = capture(engine, session, ids)
+        raw = session.connection().connection
+        for sql, params in statements:
+            plan = [row[-1] for row in
+                    raw.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()]
+            bad = problems(plan)
+            if bad or args.verbose:
+                print(("FAIL " if bad else "ok   ") + " ".join(sql.split())[:160])
+                for detail in plan:
+                    print(("   !! " if detail in bad else "      ") + detail)
+            failed += bool(bad)
+
+    print(f"{len(statements)} statements checked, {failed} with plain scans")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP load test of the betting flow.
+
+Starts `python -m app` against a seeded temp SQLite DB, registers and
+logs in --users synthetic @bwater.com users through /register and
+/login, then runs --clients concurrent clients for --seconds, each
+picking requests from the --mix weights:
+
+    bet      POST /bet (form, session cookie), then GET of the redirect
+             target as a browser would; the follow-up is reported under
+             its own route
+    api_bet  POST /api/bet (JSON)
+    advance  GET /advance
+    odds     GET /api/odds/{market}, polling with If-None-Match
+    mybets   GET /api/me/positions
+    history  GET /api/odds/{market}/history (an hour, 60 points)
+
+With --login-spike N, N extra clients hammer POST /login for the middle
+third of the run (a crowd signing in at event start); the report then
+also splits every route into "steady" and "spike" phases, so bet
+latency under the spike can be compared with the steady state.  Logins
+shed by the password pool (503) are counted as "shed", not errors.
+
+Prints (or writes to --out) JSON with throughput and p50/p95/p99/max
+latency in ms per route, so runs can be diffed.
+
+    python -m scripts.loadtest --users 200 --clients 50 --seconds 30 \\
+        --mix bet=2,api_bet=2,advance=3,odds=5 --workers 2 --out run.json
+    python -m scripts.loadtest --users 50 --seconds 30 --login-spike 40
+"""
+
+import os, argparse, json, random, subprocess, sys, tempfile, threading, time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import httpx
+
+from scripts.benchutil import seed_db
+from scripts.bench_server import wait_up
+
+ACTIONS = ("bet", "api_bet", "advance", "odds", "mybets", "history")
+MARKETS = ("advance", "win", "prop")
+PASSWORD = "loadtest-pw"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; choose from {ACTIONS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    """Latency samples (seconds) and error counts per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)    # route -> [(start, seconds, outcome)]
+
+    def timed(self, route, send, ok=(200,)):
+        start, t0 = time.monotonic(), time.perf_counter()
+        try:
+            resp = send()
+        except httpx.HTTPError:
+            resp = None
+        elapsed = time.perf_counter() - t0
+        if resp is not None and resp.status_code == 503:
+            outcome = "shed"
+        elif resp is None or resp.status_code not in ok:
+            outcome = "errors"
+        else:
+            outcome = "ok"
+        with self._lock:
+            self.samples[route].append((start, elapsed, outcome))
+        return resp
+
+    def report(self, seconds, window=None):
+        """Per-route stats; with window=(start, end), only requests started in it."""
+        def pct(values, p):
+            return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            if window is not None:
+                samples = [s for s in samples if window[0] <= s[0] < window[1]]
+            if not samples:
+                continue
+            values = sorted(e for _, e, _ in samples)
+            outcomes = [o for _, _, o in samples]
+            routes[route] = {
+                "requests": len(values),
+                "errors": outcomes.count("errors"),
+                "shed": outcomes.count("shed"),
+                "rps": round(len(values) / seconds, 1),
+                "p50_ms": round(pct(values, 50), 2),
+                "p95_ms": round(pct(values, 95), 2),
+                "p99_ms": round(pct(values, 99), 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return routes
+
+
+def register_and_login(base, email, rec):
+    """Return an httpx.Client holding a logged-in session cookie for `email`."""
+    client = httpx.Client(base_url=base, follow_redirects=False, timeout=30)
+    creds = {"email": email, "password": PASSWORD}
+    for route, path, form in (("POST /register", "/register",
+                               {**creds, "confirm_password": PASSWORD}),
+                              ("POST /login", "/login", creds)):
+        # shed (503) requests are retried after Retry-After, like a browser user would
+        while True:
+            resp = rec.timed(route, lambda: client.post(path, data=form), ok=(302,))
+            if resp is None or resp.status_code != 503:
+                break
+            time.sleep(float(resp.headers.get("retry-after", 1)))
+    return client
+
+
+def drive(client, email, ids, mix, stop, rec, seed):
+    rnd = random.Random(seed)
+    actions, weights = zip(*mix.items())
+    etags = {}
+
+    def target(market):
+        return rnd.choice(ids["props"] if market == "prop" else ids["players"])
+
+    while time.monotonic() < stop:
+        action = rnd.choices(actions, weights)[0]
+        market = rnd.choice(MARKETS)
+        amount = round(rnd.uniform(1, 100), 2)
+        if action == "bet":
+            form = {"market": market, "target_id": target(market), "amount": amount}
+            if market == "prop":
+                form["side_yes"] = rnd.choice(("true", "false"))
+            page = "/props" if market == "prop" else f"/{market}"
+            referer = {"Referer": f"{client.base_url}{page}"}
+            resp = rec.timed("POST /bet", lambda: client.post("/bet", data=form, headers=referer),
+                             ok=(302,))
+            if resp is not None and resp.status_code == 302:
+                path = httpx.URL(resp.headers["location"]).path
+                rec.timed(f"GET {path}", lambda: client.get(path))
+        elif action == "api_bet":
+            body = {"market": market, "target_id": target(market), "amount": amount}
+            if market == "prop":
+                body["side_yes"] = rnd.random() < 0.5
+            rec.timed("POST /api/bet", lambda: client.post("/api/bet", json=body))
+        elif action == "advance":
+            rec.timed("GET /advance", lambda: client.get("/advance"))
+        elif action == "mybets":
+            rec.timed("GET /api/me/positions", lambda: client.get("/api/me/positions"))
+        elif action == "history":
+            params = {"start": int(time.time()) - 3600, "points": 60}
+            rec.timed("GET /api/odds/{market}/history",
+                      lambda: client.get(f"/api/odds/{market}/history", params=params))
+        else:
+            headers = {"If-None-Match": etags[market]} if market in etags else {}
+            resp = rec.timed("GET /api/odds/{market}",
+                             lambda: client.get(f"/api/odds/{market}", headers=headers),
+                             ok=(200, 304))
+            if resp is not None and "etag" in resp.headers:
+                etags[market] = resp.headers["etag"]
+
+
+def login_spike(base, emails, start, stop, rec, seed):
+    """POST /login in a loop with a fresh client from `start` until `stop`."""
+    rnd = random.Random(seed)
+    time.sleep(max(0.0, start - time.monotonic()))
+    with httpx.Client(base_url=base, follow_redirects=False, timeout=30) as client:
+        while time.monotonic() < stop:
+            creds = {"email": rnd.choice(emails), "password": PASSWORD}
+            resp = rec.timed("POST /login", lambda: client.post("/login", data=creds), ok=(302,))
+            client.cookies.clear()
+            if resp is not None and resp.status_code == 503:
+                time.sleep(float(resp.headers.get("retry-after", 1)))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1],
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--clients", type=int, default=None, help="default: one per user")
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--mix", type=parse_mix, default=parse_mix("bet=2,api_bet=2,advance=3,odds=5"))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    ap.add_argument("--bets", type=int, default=10_000, help="bets per market to seed")
+    ap.add_argument("--port", type=int, default=8790)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--login-spike", type=int, default=0, metavar="N",
+                    help="N extra clients logging in during the middle third of the run")
+    ap.add_argument("--out", default=None, help="write JSON here instead of stdout")
+    args = ap.parse_args(argv)
+    clients = args.clients or args.users
+
+    tmp = Path(tempfile.mkdtemp(prefix="bwets-load-"))
+    _, _, ids = seed_db(tmp / "load.db", args.bets, seed=args.seed)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp / 'load.db'}",
+               ROSTER_STAMP=str(tmp / "roster.stamp"))
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app", "--workers", str(args.workers), "--port", str(args.port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_up(base)
+        signup, rec = Recorder(), Recorder()
+        emails = [f"load{i}@bwater.com" for i in range(args.users)]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(min(clients, args.users)) as pool:
+            sessions = list(pool.map(lambda e: register_and_login(base, e, signup), emails))
+        signup_seconds = time.perf_counter() - t0
+
+        begin = time.monotonic()
+        stop = begin + args.seconds
+        spike = (begin + args.seconds / 3, begin + 2 * args.seconds / 3)
+        threads = [threading.Thread(target=drive, args=(
+            sessions[i % args.users], emails[i % args.users], ids, args.mix, stop, rec,
+            args.seed + i)) for i in range(clients)]
+        threads += [threading.Thread(target=login_spike, args=(
+            base, emails, *spike, rec, args.seed + clients + i))
+            for i in range(args.login_spike)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        for c in sessions:
+            c.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    routes = rec.report(elapsed)
+    total = sum(r["requests"] for r in routes.values())
+    result = {
+        "config": {"users": args.users, "clients": clients, "seconds": args.seconds,
+                   "mix": args.mix, "workers": args.workers, "seed_bets": args.bets,
+                   "cpus": os.cpu_count()},
+        "signup": {"seconds": round(signup_seconds, 2), **signup.report(signup_seconds)},
+        "routes": routes,
+        **({"phases": {"steady": rec.report(spike[0] - begin, (begin, spike[0])),
+                       "spike": rec.report(spike[1] - spike[0], spike)}}
+           if args.login_spike else {}),
+        "total": {"requests": total, "rps": round(total / elapsed, 1),
+                  "errors": sum(r["errors"] for r in routes.values())},
+    }
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the covering indexes on the bet tables
+"""
+from dotenv import load_dotenv
+from sqlalchemy import inspect
+from app.models import AdvanceBet, WinBet, PropBet, engine
+
+load_dotenv()
+
+def migrate():
+    """Create any index declared on the bet models that the database lacks"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = inspector.get_table_names()
+        
+        for model in (AdvanceBet, WinBet, PropBet):
+            table = model.__table__
+            if table.name not in existing_tables:
+                continue
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    print(f"Creating {index.name} on {table.name}...")
+                    index.create(conn)
+        
+        if conn.dialect.name == "sqlite":
+            # refresh planner statistics so the new indexes get picked
+            conn.exec_driver_sql("ANALYZE")
+    
+    print("Index migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -2,18 +2,14 @@
 """
 Database migration script to add user authentication support
 """
-import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, inspect
-from app.models import Base, User
+from sqlalchemy import text, inspect
+from app.models import User, engine
 
 load_dotenv()
 
 def migrate():
     """Add users table and missing columns to existing database"""
-    DATABASE_URL = os.environ["DATABASE_URL"]
-    engine = create_engine(DATABASE_URL, future=True, echo=True)
-    
     with engine.begin() as conn:
         inspector = inspect(conn)
         existing_tables = inspector.get_table_names()
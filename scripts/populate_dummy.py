@@ -8,13 +8,31 @@ immediately.  The script:
 1. Reads DATABASE_URL from .env (SQLite by default)
 2. Executes schema.sql (re‑creates all tables)
 3. Inserts player + prop rows
+4. With --bets N, bulk-loads N synthetic bets across the three markets
+
+The bet generator is built for load testing: stakes follow a heavy-tailed
+(lognormal or Pareto) distribution, bettors are drawn Zipf-style from
+--users addresses, and placed_at clusters in --bursts spikes over the
+last --hours.  Rows go in with batched executemany inside one
+transaction, with the bet-table indexes and pool_totals triggers dropped
+for the load and rebuilt (and the aggregate tables reconciled) afterwards;
+the drops are part of that transaction, so a failed load leaves the DB
+as it was.
+
+    python -m scripts.populate_dummy --bets 3000000 --users 5000
+    python -m scripts.populate_dummy --append --bets 500000 --stakes pareto
 """
 
 import os
+import re
 import uuid
+import time
+import argparse
 import logging
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 from string import ascii_uppercase
 
@@ -24,72 +42,262 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///data/bwets.db")
+os.environ.setdefault("DATABASE_URL", DB_URL)     # for the app.models imports below
 DATA_DIR = "data"
 PLAYERS_CSV = os.path.join(DATA_DIR, "players.csv")
 PROPS_CSV = os.path.join(DATA_DIR, "props.csv")
 SCHEMA_SQL = "schema.sql"
 
-os.makedirs(DATA_DIR, exist_ok=True)
-engine = create_engine(DB_URL, future=True, echo=False)
+# share of --bets that goes to each market
+MARKET_SHARE = {"advance": 0.5, "win": 0.3, "prop": 0.2}
+BET_TABLES = {"advance": "advance_bets", "win": "win_bets", "prop": "prop_bets"}
+
+
+def market_counts(n_bets):
+    """{market: bets} by MARKET_SHARE; the last market takes the rounding remainder."""
+    counts = {m: int(n_bets * share) for m, share in MARKET_SHARE.items()}
+    last = list(MARKET_SHARE)[-1]
+    counts[last] += n_bets - sum(counts.values())
+    return counts
+
 
 # ─────────────── default CSVs (if user hasn’t provided) ───────────────
-if not os.path.exists(PLAYERS_CSV):
-    divisions = ["Open", "Women", "Masters"]          # 3 divisions
-    heats_per_div = 5                                 # 5 heats each
-    players_per_heat = 6                              # 6 runners per heat
-
-    # generator for player names: A, B, … Z, AA, AB, …
-    def name_gen():
-        i = 0
-        while True:
-            q, r = divmod(i, 26)
-            yield (ascii_uppercase[r] if q == 0
-                   else ascii_uppercase[q-1] + ascii_uppercase[r])
-            i += 1
-
-    names = name_gen()
-    rows = []
-    for div in divisions:
-        for heat in range(1, heats_per_div + 1):
-            for _ in range(players_per_heat):
-                rows.append([next(names), heat, div])
-
-    pd.DataFrame(rows, columns=["player_name", "heat", "division"]).to_csv(
-        PLAYERS_CSV, index=False
-    )
-    logging.info("Created default %s wish %d players", PLAYERS_CSV, len(rows))
-
-if not os.path.exists(PROPS_CSV):
-    pd.Series(
-        ["Record broken", "Photo finish (<0.5 s)", "Equities winner"]
-    ).to_csv(PROPS_CSV, index=False, header=False)
-    logging.info("Created default %s", PROPS_CSV)
+def write_default_csvs():
+    if not os.path.exists(PLAYERS_CSV):
+        divisions = ["Open", "Women", "Masters"]          # 3 divisions
+        heats_per_div = 5                                 # 5 heats each
+        players_per_heat = 6                              # 6 runners per heat
+
+        # generator for player names: A, B, … Z, AA, AB, …
+        def name_gen():
+            i = 0
+            while True:
+                q, r = divmod(i, 26)
+                yield (ascii_uppercase[r] if q == 0
+                       else ascii_uppercase[q-1] + ascii_uppercase[r])
+                i += 1
+
+        names = name_gen()
+        rows = []
+        for div in divisions:
+            for heat in range(1, heats_per_div + 1):
+                for _ in range(players_per_heat):
+                    rows.append([next(names), heat, div])
+
+        pd.DataFrame(rows, columns=["player_name", "heat", "division"]).to_csv(
+            PLAYERS_CSV, index=False
+        )
+        logging.info("Created default %s wish %d players", PLAYERS_CSV, len(rows))
+
+    if not os.path.exists(PROPS_CSV):
+        pd.Series(
+            ["Record broken", "Photo finish (<0.5 s)", "Equities winner"]
+        ).to_csv(PROPS_CSV, index=False, header=False)
+        logging.info("Created default %s", PROPS_CSV)
 
 
 # ───────────────── load CSVs → DataFrames ──────────────────────────────
-players = pd.read_csv(PLAYERS_CSV)
-players["id"] = [str(uuid.uuid4()) for _ in range(len(players))]
-players["dropped_out"] = False
-players["active"] = True
-
-props = pd.read_csv(PROPS_CSV, header=None, names=["prop_name"])
-props["id"] = [str(uuid.uuid4()) for _ in range(len(props))]
-props["active"] = True
-
-# ───────── If SQLite, wipe the file so schema always recreates ────────
-if engine.dialect.name == "sqlite":
-    db_path = engine.url.database            # e.g. data/bwets.db
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        logging.info("Removed existing %s", db_path)
-
-# ───────────────── exec schema & insert rows ───────────────────────────
-with engine.begin() as conn:
-    # executescript lets us run multiple statements in SQLite
-    raw_conn = conn.connection
-    raw_conn.executescript(open(SCHEMA_SQL).read())
-
-    players.to_sql("players", conn, if_exists="append", index=False)
-    props.to_sql("prop_universe", conn, if_exists="append", index=False)
-
-logging.info("✅  Seeded DB with %d players, %d props", len(players), len(props))
+def read_entities():
+    players = pd.read_csv(PLAYERS_CSV)
+    players["id"] = [str(uuid.uuid4()) for _ in range(len(players))]
+    players["dropped_out"] = False
+    players["active"] = True
+
+    props = pd.read_csv(PROPS_CSV, header=None, names=["prop_name"])
+    props["id"] = [str(uuid.uuid4()) for _ in range(len(props))]
+    props["active"] = True
+    return players, props
+
+
+def seed_entities(engine):
+    """Recreate the schema and insert the CSV players + props."""
+    write_default_csvs()
+    players, props = read_entities()
+
+    # ───────── If SQLite, wipe the file so schema always recreates ────────
+    if engine.dialect.name == "sqlite":
+        db_path = engine.url.database            # e.g. data/bwets.db
+        if os.path.exists(db_path):
+            os.remove(db_path)
+            logging.info("Removed existing %s", db_path)
+        for suffix in ("-wal", "-shm"):         # left behind by SQLITE_PROFILE=wal
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    # ───────────────── exec schema & insert rows ───────────────────────────
+    with engine.begin() as conn:
+        # executescript lets us run multiple statements in SQLite
+        raw_conn = conn.connection
+        raw_conn.executescript(open(SCHEMA_SQL).read())
+
+        players.to_sql("players", conn, if_exists="append", index=False)
+        props.to_sql("prop_universe", conn, if_exists="append", index=False)
+
+    logging.info("✅  Seeded DB with %d players, %d props", len(players), len(props))
+
+
+# ───────────────── synthetic bets ──────────────────────────────────────
+def stake_sampler(rng, kind, median, shape, cap):
+    """Return draw(n) -> ndarray of heavy-tailed stakes in [1, cap]."""
+    if kind == "lognormal":
+        def draw(n):
+            return rng.lognormal(np.log(median), shape, n)
+    elif kind == "pareto":
+        # Lomax + 1 scaled so the median lands on `median`
+        scale = median / (2 ** (1 / shape))
+        def draw(n):
+            return scale * (rng.pareto(shape, n) + 1)
+    else:
+        raise ValueError(f"unknown stake distribution {kind!r}")
+    return lambda n: np.round(np.clip(draw(n), 1.0, cap), 2)
+
+
+def zipf_weights(n, skew):
+    """Normalized 1/rank**skew popularity weights (skew 0 = uniform)."""
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def time_sampler(rng, hours, bursts, burst_share, burst_minutes):
+    """Return draw(n) -> placed_at strings: Poisson background plus bursts."""
+    end = datetime.utcnow()
+    window = hours * 3600.0
+    centers = np.sort(rng.uniform(0, window, bursts)) if bursts else np.empty(0)
+
+    def draw(n):
+        offsets = rng.uniform(0, window, n)
+        if bursts:
+            in_burst = rng.random(n) < burst_share
+            k = int(in_burst.sum())
+            offsets[in_burst] = rng.choice(centers, k) + rng.normal(0, burst_minutes * 60, k)
+        offsets = np.clip(offsets, 0, window)
+        start = end - timedelta(seconds=window)
+        return [(start + timedelta(seconds=float(s))).isoformat(" ") for s in offsets]
+    return draw
+
+
+def bet_ids(n):
+    """Random uuid4 strings; not from the seeded rng, so --append never repeats ids."""
+    return [str(uuid.uuid4()) for _ in range(n)]
+
+
+def drop_bulk_overhead(conn):
+    """Drop bet-table indexes (and SQLite aggregate triggers); return what to rebuild."""
+    from app.models import AdvanceBet, WinBet, PropBet
+    from scripts.reconcile_pool_totals import TRIGGER_DDL
+
+    indexes = [ix for m in (AdvanceBet, WinBet, PropBet) for ix in m.__table__.indexes]
+    for ix in indexes:
+        conn.execute(text(f"drop index if exists {ix.name}"))
+    triggers = TRIGGER_DDL if conn.dialect.name == "sqlite" else []
+    for ddl in triggers:
+        name = re.match(r"create trigger (\w+)", ddl, re.I).group(1)
+        conn.execute(text(f"drop trigger if exists {name}"))
+    return indexes, triggers
+
+
+def restore_bulk_overhead(conn, indexes, triggers):
+    from scripts.reconcile_pool_totals import ensure_aggregates, rebuild
+
+    t0 = time.perf_counter()
+    for ix in indexes:
+        ix.create(conn)
+    for ddl in triggers:
+        conn.exec_driver_sql(ddl)
+    ensure_aggregates(conn)
+    rebuild(conn)
+    logging.info("🏗️  Rebuilt %d indexes, %d triggers and the aggregate tables in %.1fs",
+                 len(indexes), len(triggers), time.perf_counter() - t0)
+
+
+def generate_bets(engine, n_bets, users=2_000, user_skew=1.0, stakes="lognormal",
+                  stake_median=20.0, stake_shape=1.2, stake_cap=10_000.0, hours=6.0,
+                  bursts=8, burst_share=0.6, burst_minutes=3.0, batch=50_000, seed=0):
+    """Bulk-load `n_bets` synthetic bets split across markets by MARKET_SHARE."""
+    rng = np.random.default_rng(seed)
+    draw_stake = stake_sampler(rng, stakes, stake_median, stake_shape, stake_cap)
+    draw_time = time_sampler(rng, hours, bursts, burst_share, burst_minutes)
+    emails = np.array([f"user{i}@bwater.com" for i in range(users)], dtype=object)
+    email_w = zipf_weights(users, user_skew)
+
+    with engine.begin() as conn:
+        players = [r[0] for r in conn.execute(text("select id from players"))]
+        props = [r[0] for r in conn.execute(text("select id from prop_universe"))]
+        if not players or not props:
+            raise SystemExit("no players/props in the DB; run without --append first")
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql("PRAGMA cache_size=-262144")
+            # pysqlite runs DDL outside any transaction unless one is open, so a
+            # failed load would keep the dropped indexes / triggers; open it here
+            conn.exec_driver_sql("BEGIN")
+        mark = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+        cursor = conn.connection.cursor()
+
+        t0 = time.perf_counter()
+        indexes, triggers = drop_bulk_overhead(conn)
+        for market, n in market_counts(n_bets).items():
+            targets = np.array(props if market == "prop" else players, dtype=object)
+            # a few favourites draw most of the money, like a real book
+            target_w = rng.dirichlet(np.full(len(targets), 0.5))
+            cols = ["bet_id", "player_id" if market != "prop" else "prop_id",
+                    "bettor_email", "amount", "placed_at"]
+            if market == "prop":
+                cols.append("side_yes")
+            sql = (f"insert into {BET_TABLES[market]} ({', '.join(cols)}) "
+                   f"values ({', '.join([mark] * len(cols))})")
+            for start in range(0, n, batch):
+                k = min(batch, n - start)
+                columns = [bet_ids(k),
+                           rng.choice(targets, k, p=target_w),
+                           rng.choice(emails, k, p=email_w),
+                           draw_stake(k).tolist(),
+                           draw_time(k)]
+                if market == "prop":
+                    columns.append((rng.random(k) < 0.5).tolist())
+                cursor.executemany(sql, list(zip(*columns)))
+            logging.info("🎲  %s: %d bets", market, n)
+        cursor.close()
+        restore_bulk_overhead(conn, indexes, triggers)
+
+    elapsed = time.perf_counter() - t0
+    logging.info("✅  Loaded %d bets in %.1fs (%.0f bets/s)", n_bets, elapsed,
+                 n_bets / elapsed if elapsed else 0)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1],
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--append", action="store_true",
+                    help="keep the existing DB and players/props; only add bets")
+    ap.add_argument("--bets", type=int, default=0, help="total synthetic bets to load")
+    ap.add_argument("--users", type=int, default=2_000, help="distinct bettor emails")
+    ap.add_argument("--user-skew", type=float, default=1.0,
+                    help="Zipf exponent for bettor activity (0 = uniform)")
+    ap.add_argument("--stakes", choices=("lognormal", "pareto"), default="lognormal")
+    ap.add_argument("--stake-median", type=float, default=20.0)
+    ap.add_argument("--stake-shape", type=float, default=1.2,
+                    help="lognormal sigma, or Pareto alpha (lower = heavier tail)")
+    ap.add_argument("--stake-cap", type=float, default=10_000.0)
+    ap.add_argument("--hours", type=float, default=6.0, help="placed_at window, ending now")
+    ap.add_argument("--bursts", type=int, default=8, help="betting spikes in the window")
+    ap.add_argument("--burst-share", type=float, default=0.6,
+                    help="fraction of bets placed inside a spike")
+    ap.add_argument("--batch", type=int, default=50_000, help="rows per executemany")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    engine = create_engine(DB_URL, future=True, echo=False)
+    if not args.append:
+        seed_entities(engine)
+    if args.bets:
+        generate_bets(engine, args.bets, users=args.users, user_skew=args.user_skew,
+                      stakes=args.stakes, stake_median=args.stake_median,
+                      stake_shape=args.stake_shape, stake_cap=args.stake_cap,
+                      hours=args.hours, bursts=args.bursts, burst_share=args.burst_share,
+                      batch=args.batch, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
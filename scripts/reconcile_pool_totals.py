@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized aggregate tables from the raw bet tables.
+
+pool_totals (stake per market / target) and bettor_positions (stake per
+bettor / market / target) are both kept current by SQLite triggers.
+
+▪ Creates either table and its triggers (from schema.sql) if missing
+▪ --check: report drift between the tables and the bet tables, change nothing
+▪ --install: only create + backfill tables that are missing (boot-safe)
+▪ otherwise: replace every row in one transaction
+"""
+
+import re, argparse, logging
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from app.models import engine
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
+
+SCHEMA_SQL_TXT = Path("schema.sql").read_text()
+
+# aggregate table -> (trigger name infix, leading group-by columns)
+AGGREGATES = {
+    "pool_totals":      ("pool", ()),
+    "bettor_positions": ("pos",  ("bettor_email",)),
+}
+TABLE_DDL = {name: re.search(rf"create table {name} .*?\n\);", SCHEMA_SQL_TXT, re.S | re.I).group(0)
+             for name in AGGREGATES}
+TRIGGERS = {name: re.findall(rf"create trigger \w+_{infix}_\w+ .*?\nend;", SCHEMA_SQL_TXT,
+                             re.S | re.I)
+            for name, (infix, _) in AGGREGATES.items()}
+TRIGGER_DDL = [ddl for name in AGGREGATES for ddl in TRIGGERS[name]]
+
+# (market, bet table, target column, side expression)
+SOURCES = (
+    ("advance", "advance_bets", "player_id", "false"),
+    ("win",     "win_bets",     "player_id", "false"),
+    ("prop",    "prop_bets",    "prop_id",   "side_yes"),
+)
+
+
+def ensure_aggregates(conn) -> list:
+    """Create missing aggregate tables (+ triggers on SQLite); return the created names."""
+    existing = set(inspect(conn).get_table_names())
+    created = []
+    for name in AGGREGATES:
+        if name in existing:
+            continue
+        logging.info("🏗️  Creating %s", name)
+        conn.exec_driver_sql(TABLE_DDL[name])
+        if conn.dialect.name == "sqlite":
+            for ddl in TRIGGERS[name]:
+                conn.exec_driver_sql(ddl)
+        else:
+            logging.warning("%s triggers are SQLite-only; run this script to refresh", name)
+        created.append(name)
+    return created
+
+
+def rebuild(conn, tables=tuple(AGGREGATES)) -> None:
+    for name in tables:
+        keys = AGGREGATES[name][1]
+        cols = "".join(f"{k}, " for k in keys)
+        conn.execute(text(f"delete from {name}"))
+        for market, table, target, side in SOURCES:
+            conn.execute(text(
+                f"insert into {name} ({cols}market, target_id, side_yes, stake, n_bets) "
+                f"select {cols}'{market}', {target}, {side}, sum(amount), count(*) "
+                f"from {table} group by {cols}{target}, {side}"))
+
+
+def drift(conn, name="pool_totals") -> dict:
+    """{(keys..., market, target_id, side_yes): (stored row, recomputed row)} for mismatches."""
+    cols = "".join(f"{k}, " for k in AGGREGATES[name][1])
+    stored = {(*k, bool(s)): (round(st, 2), n) for *k, s, st, n in conn.execute(text(
+        f"select {cols}market, target_id, side_yes, stake, n_bets from {name} "
+        f"where n_bets != 0"))}
+    actual = {}
+    for market, table, target, side in SOURCES:
+        for *k, s, st, n in conn.execute(text(
+                f"select {cols}'{market}', {target}, {side}, sum(amount), count(*) "
+                f"from {table} group by {cols}{target}, {side}")):
+            actual[(*k, bool(s))] = (round(st, 2), n)
+    return {k: (stored.get(k), actual.get(k))
+            for k in stored.keys() | actual.keys() if stored.get(k) != actual.get(k)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="report drift only")
+    mode.add_argument("--install", action="store_true",
+                      help="create and backfill only the tables that are missing")
+    args = ap.parse_args()
+
+    with engine.begin() as conn:
+        if args.check:
+            missing = set(AGGREGATES) - set(inspect(conn).get_table_names())
+            if missing:
+                logging.warning("%s missing; run without --check to create",
+                                ", ".join(sorted(missing)))
+                raise SystemExit(1)
+            drifted = 0
+            for name in AGGREGATES:
+                diffs = drift(conn, name)
+                for key, (stored, actual) in sorted(diffs.items()):
+                    logging.warning("%s %s: stored=%s actual=%s", name, key, stored, actual)
+                logging.info("%s %s", name,
+                             f"has {len(diffs)} drifted rows" if diffs else "is consistent")
+                drifted += len(diffs)
+            raise SystemExit(1 if drifted else 0)
+
+        created = ensure_aggregates(conn)
+        tables = created if args.install else list(AGGREGATES)
+        if not tables:
+            return
+        rebuild(conn, tables)
+
+    logging.info("🔄  %s rebuilt from the bet tables", ", ".join(tables))
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,19 @@
 Refresh players & props from the CSVs WITHOUT touching bets.
 
 ▪ Creates the schema + DB file on first boot (so Fly volumes work)
-▪ Adds new rows
+▪ Adds new rows, reactivates returning ones
 ▪ Sets .active = False for rows removed from the CSVs
+▪ All in a few set-based statements over temp staging tables
 """
 
-import os, csv, uuid, logging
+import os, re, csv, uuid, logging
 from pathlib import Path
 from dotenv import load_dotenv
 
-from sqlalchemy import select, inspect, text, Connection
-from app.models import SessionLocal, Player, PropUniverse, engine   # ← engine!
+from sqlalchemy import inspect, text, Connection
+from sqlalchemy.exc import IntegrityError
+from app.models import engine
+from app.pages import bump_roster_version
 
 # ───── paths ──────────────────────────────────────────────────────
 DATA_DIR      = "data"
@@ -40,7 +43,11 @@ def run_ddl(conn: Connection) -> None:
         # connection.driver_connection is the raw pysqlite connection
         conn.connection.executescript(SCHEMA_SQL_TXT)
     else:
-        for stmt in filter(None, (s.strip() for s in SCHEMA_SQL_TXT.split(";"))):
+        # the aggregate-table triggers are SQLite syntax; reconcile_pool_totals
+        # keeps those tables current elsewhere
+        ddl = re.sub(r"create trigger .*?\nend;", "", SCHEMA_SQL_TXT, flags=re.S | re.I)
+        ddl = re.sub(r"--[^\n]*", "", ddl)
+        for stmt in filter(None, (s.strip() for s in ddl.split(";"))):
             conn.exec_driver_sql(stmt)
 
 def read_players():
@@ -73,48 +80,89 @@ def ensure_schema():
         with engine.begin() as conn:
             run_ddl(conn)
 
+# ───── set-based reconcile ────────────────────────────────────────
+# The CSVs go into temp staging tables; players / props are then brought in
+# line with a handful of set statements, so the write lock is held for a few
+# statements instead of one ORM flush per row.  Works on SQLite (>= 3.24) and
+# Postgres alike; ids for new rows are generated here, as the ORM would.
+ENTRY_INDEX = ("create unique index if not exists ux_players_entry "
+               "on players (player_name, heat, division)")
+
+STAGING_DDL = (
+    # a connection left over from a failed run may still hold them
+    "drop table if exists staging_players",
+    "drop table if exists staging_props",
+    "create temporary table staging_players "
+    "(id text, player_name text, heat integer, division text)",
+    "create temporary table staging_props (id text, prop_name text)",
+    "create index staging_players_entry on staging_players (player_name, heat, division)",
+    "create index staging_props_name on staging_props (prop_name)",
+)
+
+RECONCILE = {
+    # "where true" lets SQLite parse ON CONFLICT after INSERT ... SELECT
+    "players added / reactivated": """
+        insert into players (id, player_name, heat, division, dropped_out, active)
+        select id, player_name, heat, division, false, true from staging_players where true
+        on conflict (player_name, heat, division) do update set active = true
+        where players.active = false""",
+    "players deactivated": """
+        update players set active = false
+        where active = true and not exists (
+            select 1 from staging_players s
+            where s.player_name = players.player_name
+              and s.heat = players.heat and s.division = players.division)""",
+    "props added / reactivated": """
+        insert into prop_universe (id, prop_name, active)
+        select id, prop_name, true from staging_props where true
+        on conflict (prop_name) do update set active = true
+        where prop_universe.active = false""",
+    "props deactivated": """
+        update prop_universe set active = false
+        where active = true and not exists (
+            select 1 from staging_props s where s.prop_name = prop_universe.prop_name)""",
+}
+
+
+def reconcile(conn: Connection, players, props) -> dict:
+    """Upsert / deactivate players and props to match the given rows; {step: rowcount}."""
+    try:
+        conn.exec_driver_sql(ENTRY_INDEX)
+    except IntegrityError:
+        dupes = conn.execute(text(
+            "select player_name, heat, division from players "
+            "group by player_name, heat, division having count(*) > 1")).all()
+        logging.error("players has duplicate (name, heat, division) rows %s; merge them "
+                      "before refreshing", dupes)
+        raise
+    for ddl in STAGING_DDL:
+        conn.exec_driver_sql(ddl)
+    if players:
+        conn.execute(text("insert into staging_players values (:id, :n, :h, :d)"),
+                     [{"id": str(uuid.uuid4()), "n": n, "h": h, "d": d} for n, h, d in players])
+    if props:
+        conn.execute(text("insert into staging_props values (:id, :n)"),
+                     [{"id": str(uuid.uuid4()), "n": n} for n in props])
+    counts = {step: conn.execute(text(sql)).rowcount for step, sql in RECONCILE.items()}
+    conn.exec_driver_sql("drop table staging_players")
+    conn.exec_driver_sql("drop table staging_props")
+    return counts
+
+
 # ───── main refresh routine ───────────────────────────────────────
 def main() -> None:
     ensure_schema()
 
-    new_players = list(read_players())
-    new_props   = list(read_props())
-
-    with SessionLocal() as db:
-        # ─── PLAYERS ───────────────────────────────────────────────
-        db_players = db.execute(select(Player)).scalars().all()
-        db_keyed = {(p.player_name, p.heat, p.division): p for p in db_players}
-
-        for name, heat, div in new_players:
-            key = (name, heat, div)
-            if key in db_keyed:
-                db_keyed[key].active = True
-            else:
-                db.add(Player(
-                    player_name=name, heat=heat, division=div,
-                    active=True, dropped_out=False
-                ))
-
-        new_set = set(new_players)
-        for key, player in db_keyed.items():
-            if key not in new_set:
-                player.active = False
-
-        # ─── PROPS ────────────────────────────────────────────────
-        db_props = {p.prop_name: p for p in db.execute(select(PropUniverse)).scalars()}
-        for prop in new_props:
-            if prop in db_props:
-                db_props[prop].active = True
-            else:
-                db.add(PropUniverse(prop_name=prop, active=True))
-
-        for name, p in db_props.items():
-            if name not in new_props:
-                p.active = False
-
-        db.commit()
-
-    logging.info("🔄  Players & props refreshed ‑ bets untouched")
+    # duplicate CSV lines collapse to one row, as the old per-key diff did
+    new_players = list(dict.fromkeys(read_players()))
+    new_props   = list(dict.fromkeys(read_props()))
+
+    with engine.begin() as conn:
+        counts = reconcile(conn, new_players, new_props)
+
+    bump_roster_version()           # running app rebuilds its cached page models
+    logging.info("🔄  Players & props refreshed ‑ bets untouched (%s)",
+                 ", ".join(f"{n} {step}" for step, n in counts.items()))
 
 if __name__ == "__main__":
     main()
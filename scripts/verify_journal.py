@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare bet journal files with the bet tables.
+
+Reads every journal (default: all of BET_JOURNAL_DIR, or the paths given)
+with the mmap reader in app/journal.py and checks each record against the
+DB row with the same bet_id:
+
+▪ missing   no row with that bet_id yet (not projected)
+▪ mismatch  the row's target / amount / bettor / side differ from the record
+▪ torn      bytes after the last valid record (a crash mid-append)
+
+A running server's own journal may show a handful of missing bets that
+are simply still being projected.  --project inserts the missing ones
+(idempotent by bet_id).  Exits 1 if anything is missing (and not
+projected) or mismatched.  Quarantined records (quarantine-*.journal,
+see app/journal.py) are only checked when their paths are given.
+
+    python -m scripts.verify_journal
+    python -m scripts.verify_journal /data/journal/bets-123-456.journal --project
+"""
+
+import os, sys, argparse, logging
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from app.models import SessionLocal
+from app.journal import read_journal, project, MODELS, PROJECT_BATCH
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
+
+
+def compare(session, records):
+    """(missing records, [(record, db row)] mismatches) for `records`."""
+    by_market = {}
+    for rec in records:
+        by_market.setdefault(rec[0][0], []).append(rec)
+    missing, mismatched = [], []
+    for market, recs in by_market.items():
+        model = MODELS[market]
+        target = model.prop_id if market == "prop" else model.player_id
+        rows = {}
+        for i in range(0, len(recs), PROJECT_BATCH):
+            ids = [bet[5] for bet, _ in recs[i:i + PROJECT_BATCH]]
+            rows.update((r[0], r[1:]) for r in session.execute(
+                select(model.bet_id, target, model.amount, model.bettor_email,
+                       model.side_yes if market == "prop" else model.bet_id)
+                .where(model.bet_id.in_(ids))))
+        for rec in recs:
+            bet = rec[0]
+            row = rows.get(bet[5])
+            if row is None:
+                missing.append(rec)
+                continue
+            side = bool(row[3]) if market == "prop" else None
+            if (str(row[0]), row[1], row[2], side) != (bet[1], bet[2], bet[3], bet[4]):
+                mismatched.append((bet, row))
+    return missing, mismatched
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1],
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="*", help="journal files (default: BET_JOURNAL_DIR/*)")
+    ap.add_argument("--project", action="store_true", help="insert missing records")
+    args = ap.parse_args(argv)
+
+    paths = [Path(p) for p in args.paths]
+    if not paths:
+        directory = os.getenv("BET_JOURNAL_DIR")
+        if not directory:
+            ap.error("no journal paths given and BET_JOURNAL_DIR is not set")
+        paths = sorted(Path(directory).glob("bets-*.journal"))
+    if not paths:
+        logging.info("no journal files")
+        return 0
+
+    bad = 0
+    with SessionLocal() as db:
+        for path in paths:
+            scan = read_journal(path)
+            missing, mismatched = compare(db, scan.records)
+            for bet, row in mismatched:
+                logging.warning("%s: bet %s journal=%s db=%s", path.name, bet[5], bet[:5], row)
+            projected = 0
+            if missing and args.project:
+                for i in range(0, len(missing), PROJECT_BATCH):
+                    projected += project(missing[i:i + PROJECT_BATCH])
+            torn = scan.size - scan.valid_bytes
+            logging.info("%s: %d records, %d missing%s, %d mismatched, %d torn bytes",
+                         path.name, len(scan.records), len(missing),
+                         f" ({projected} projected)" if args.project else "",
+                         len(mismatched), torn)
+            bad += len(mismatched) + len(missing) - projected
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Shared test setup.
+
+app.models builds its engine from DATABASE_URL at import time, so the
+env points at a seeded throw-away SQLite file (scripts/benchutil.py)
+before any test imports the app.  Background threads that would race
+the assertions (ledger auto-sync, odds history) are switched off.
+"""
+
+import os, shutil, tempfile
+from pathlib import Path
+import pytest
+
+TMP = Path(tempfile.mkdtemp(prefix="bwets-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP / 'test.db'}"
+os.environ["LEDGER_SYNC_SECONDS"] = "0"
+os.environ["HISTORY_SECONDS"] = "0"
+os.environ["READ_STALENESS_SECONDS"] = "0"
+os.environ["ROSTER_STAMP"] = str(TMP / "roster.stamp")
+os.environ["ADMIN_EMAILS"] = "admin@bwater.com"
+os.environ.pop("BET_JOURNAL_DIR", None)
+
+from scripts.benchutil import seed_db
+
+_engine, _, IDS = seed_db(TMP / "test.db", 300)
+_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def ids():
+    """Player / prop ids and bettor emails of the seeded DB."""
+    return IDS
+
+
+@pytest.fixture(scope="session")
+def flask_app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(flask_app):
+    """Flask test client logged in as tester@bwater.com."""
+    client = flask_app.test_client()
+    with client.session_transaction() as s:
+        s["user_email"] = "tester@bwater.com"
+    return client
+
+
+@pytest.fixture
+def api_client(flask_app):
+    """api_client(email=None): a TestClient for /api, logged in as `email` if given."""
+    from fastapi.testclient import TestClient
+    from app.api import api
+
+    def make(email=None):
+        client = TestClient(api)
+        if email:
+            serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+            client.cookies.set(flask_app.config["SESSION_COOKIE_NAME"],
+                               serializer.dumps({"user_email": email}))
+        return client
+    return make
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _shutdown():
+    yield
+    from app.writer import bet_writer
+    bet_writer.close()
+    shutil.rmtree(TMP, ignore_errors=True)
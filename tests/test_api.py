@@ -0,0 +1,154 @@
+"""Behaviour of the /api endpoints and the cached market pages."""
+
+import json, uuid
+import pytest
+from app import pages
+from app.history import OddsSnapshotter
+from app.ledger import ledger
+from tests.test_bets import book
+
+BETTOR = "tester@bwater.com"
+ADMIN = "admin@bwater.com"
+
+
+def bet(ids, **kw):
+    return {"market": "win", "target_id": ids["players"][0], "amount": 10, **kw}
+
+
+def post(client, url, body):
+    """POST `body` as JSON, with inf / nan written as Infinity / NaN like json.dumps does."""
+    return client.post(url, content=json.dumps(body),
+                       headers={"Content-Type": "application/json"})
+
+
+# ─── /api/bet and /api/bets ───────────────────────────────────────
+def test_bet_requires_a_bwater_login(api_client, ids):
+    assert api_client().post("/bet", json=bet(ids)).status_code == 401
+    assert api_client("someone@example.com").post("/bet", json=bet(ids)).status_code == 403
+
+
+@pytest.mark.parametrize("amount", [float("inf"), float("-inf"), float("nan"), -5, 0])
+def test_bet_rejects_bad_amounts(api_client, ids, amount):
+    before = book()
+    assert post(api_client(BETTOR), "/bet", bet(ids, amount=amount)).status_code == 400
+    assert book() == before
+
+
+def test_bet_rejects_non_numeric_amounts(api_client, ids):
+    client = api_client(BETTOR)
+    assert client.post("/bet", json=bet(ids, amount="lots")).status_code == 422
+    assert client.post("/bets", json=[bet(ids), bet(ids, amount="lots")]).status_code == 422
+
+
+def test_bets_reports_each_item_and_places_only_the_valid_ones(api_client, ids):
+    before = book()
+    items = [bet(ids),
+             bet(ids, amount=float("inf")),
+             bet(ids, amount=float("nan")),
+             bet(ids, amount=-1),
+             bet(ids, target_id=str(uuid.uuid4())),
+             bet(ids, market="advance", target_id=ids["props"][0]),
+             bet(ids, market="prop", target_id=ids["players"][0], side_yes=True),
+             bet(ids, market="prop", target_id=ids["props"][0]),
+             bet(ids, market="place"),
+             bet(ids, market="prop", target_id=ids["props"][0], side_yes=False, amount=5)]
+    resp = post(api_client(BETTOR), "/bets", items)
+    assert resp.status_code == 200
+    statuses = [r["status"] for r in resp.json()]
+    assert statuses == ["ok"] + ["error"] * 8 + ["ok"]
+    assert [r["index"] for r in resp.json()] == list(range(len(items)))
+    after = book()
+    assert after["win"] == pytest.approx(before["win"] + 10)
+    assert after["prop"] == pytest.approx(before["prop"] + 5)
+    assert after["advance"] == before["advance"]
+
+
+# ─── ETags ────────────────────────────────────────────────────────
+def test_odds_etag_answers_304_until_the_pool_moves(api_client, ids):
+    client = api_client()
+    first = client.get("/odds/win")
+    assert first.status_code == 200
+    assert all(h in first.headers for h in ("ETag", "X-Snapshot-Age", "X-Snapshot-Max-Age"))
+    tag = first.headers["ETag"]
+    assert client.get("/odds/win", headers={"If-None-Match": tag}).status_code == 304
+
+    api_client(BETTOR).post("/bet", json=bet(ids))
+    moved = client.get("/odds/win", headers={"If-None-Match": tag})
+    assert moved.status_code == 200 and moved.headers["ETag"] != tag
+
+
+@pytest.mark.parametrize("page", ["/advance", "/win", "/props"])
+def test_page_etag_answers_304_until_the_pool_moves(client, ids, page):
+    first = client.get(page)
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+    assert client.get(page, headers={"If-None-Match": tag}).status_code == 304
+
+    client.post("/bet", data={"market": "prop", "target_id": ids["props"][0],
+                              "amount": "3", "side_yes": "yes"})
+    client.post("/bet", data={"market": "win", "target_id": ids["players"][0], "amount": "3"})
+    client.post("/bet", data={"market": "advance", "target_id": ids["players"][0],
+                              "amount": "3"})
+    with client.session_transaction() as s:
+        s.pop("_flashes", None)
+    moved = client.get(page, headers={"If-None-Match": tag})
+    assert moved.status_code == 200 and moved.headers["ETag"] != tag
+
+
+def test_page_model_is_cached_per_version(api_client, ids):
+    version = pages.version("win")
+    model = pages.win_model(version)
+    assert pages.win_model(version) is model
+
+    api_client(BETTOR).post("/bet", json=bet(ids))
+    assert pages.version("win") != version
+    fresh = pages.win_model(pages.version("win"))
+    assert fresh is not model
+    stake = lambda m: m["odds"][ids["players"][0]]["stake"]
+    assert stake(fresh) == pytest.approx(stake(model) + 10)
+
+
+# ─── positions, what-if, history ──────────────────────────────────
+def test_positions_include_a_bet_just_placed(api_client, ids):
+    client = api_client(BETTOR)
+    assert api_client().get("/me/positions").status_code == 401
+    before = client.get("/me/positions").json()
+    assert client.post("/bet", json=bet(ids, amount=7)).status_code == 200
+    after = client.get("/me/positions").json()
+    assert after["bettor_email"] == BETTOR
+    assert after["n_bets"] == before["n_bets"] + 1
+    assert after["total_stake"] == pytest.approx(before["total_stake"] + 7)
+    win = [p for p in after["positions"]
+           if p["market"] == "win" and p["target_id"] == ids["players"][0]]
+    assert len(win) == 1 and win[0]["stake"] >= 7
+
+
+def test_whatif_payouts_are_for_admins_only(api_client, ids):
+    url = f"/whatif/win/{ids['players'][0]}"
+    assert api_client().get(url).status_code == 401
+
+    mine = api_client(BETTOR).get(url)
+    assert mine.status_code == 200
+    assert {"pool", "winning_stake", "version"} <= set(mine.json())
+    assert "payouts" not in mine.json()
+    assert api_client(BETTOR).get(url, params={"bettor": BETTOR}).status_code == 200
+    assert api_client(BETTOR).get(url, params={"bettor": ADMIN}).status_code == 403
+
+    assert "payouts" in api_client(ADMIN).get(url).json()
+    assert api_client(ADMIN).get(url, params={"bettor": BETTOR}).status_code == 200
+    prop = f"/whatif/prop/{ids['props'][0]}"
+    assert api_client(BETTOR).get(prop).status_code == 400
+    assert api_client(BETTOR).get(prop, params={"side": "yes"}).status_code == 200
+
+
+def test_history_reads_back_a_snapshot(api_client):
+    ts = 60 * 70_000_000                 # a bucket no other test writes
+    OddsSnapshotter(60).snapshot(ts)
+    client = api_client()
+    body = client.get("/odds/win/history", params={"start": ts, "end": ts}).json()
+    assert body["ts"] == [ts]
+    stakes = {t: s["stake"][0] for t, s in body["targets"].items()}
+    assert stakes == pytest.approx({t: o["stake"] for t, o in ledger.pool_odds("win").items()
+                                    if o["stake"]}, abs=0.01)
+    assert client.get("/odds/win/history", params={"points": 0}).status_code == 400
+    assert client.get("/odds/place/history").status_code == 404
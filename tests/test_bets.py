@@ -0,0 +1,57 @@
+"""Bet validation on the write paths: app.writer and the Flask /bet form."""
+
+import json, uuid
+import pytest
+from app.models import SessionLocal
+from app.ledger import ledger
+from app.writer import bet_writer
+
+BAD_AMOUNTS = ["inf", "-inf", "nan", "-5", "0", "lots"]
+
+
+def book():
+    """Committed DB state and the ledger, both of which a rejected bet must leave alone."""
+    with SessionLocal() as db:
+        assert ledger.verify(db) == {}
+    return {m: ledger.pool_total(m) for m in ("advance", "win", "prop")}
+
+
+@pytest.mark.parametrize("amount", BAD_AMOUNTS)
+def test_writer_rejects_bad_amounts(ids, amount):
+    before = book()
+    with pytest.raises(ValueError):
+        bet_writer.place("win", ids["players"][0], amount, "tester@bwater.com")
+    assert book() == before
+
+
+def test_writer_rejects_unknown_and_cross_market_targets(ids):
+    before = book()
+    for market, target, side in [("win", str(uuid.uuid4()), None),
+                                 ("advance", ids["props"][0], None),
+                                 ("prop", ids["players"][0], True),
+                                 ("prop", ids["props"][0], None)]:
+        with pytest.raises(ValueError):
+            bet_writer.place(market, target, 10, "tester@bwater.com", side)
+    assert book() == before
+
+
+@pytest.mark.parametrize("amount", BAD_AMOUNTS)
+def test_flask_bet_flashes_bad_amounts(client, ids, amount):
+    before = book()
+    resp = client.post("/bet", data={"market": "win", "target_id": ids["players"][0],
+                                     "amount": amount})
+    assert resp.status_code == 302
+    with client.session_transaction() as s:
+        assert s.pop("_flashes")[-1][0] == "error"
+    assert book() == before
+    json.dumps(ledger.pool_odds("win"), allow_nan=False)     # what /api/odds/win sends
+
+
+def test_flask_bet_places_a_valid_bet(client, ids):
+    before = ledger.pool_total("win")
+    resp = client.post("/bet", data={"market": "win", "target_id": ids["players"][0],
+                                     "amount": "12.5"})
+    assert resp.status_code == 302
+    with client.session_transaction() as s:
+        s.pop("_flashes")
+    assert ledger.pool_total("win") == pytest.approx(before + 12.5)
@@ -0,0 +1,51 @@
+"""Journal replay and projection (app/journal.py)."""
+
+import time, uuid
+from app.models import SessionLocal
+from app.ledger import ledger
+from app.journal import JournalWriter, HEADER, MAGIC, RECORD, encode, read_journal
+from tests.test_ledger import random_bets
+
+
+def write_journal(path, bets):
+    ns = time.time_ns()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, RECORD.size))
+        f.write(b"".join(encode(bet, ns) for bet in bets))
+
+
+def test_journal_replay_is_idempotent(ids, tmp_path):
+    with SessionLocal() as db:
+        ledger.load(db)
+    bets = [bet + (str(uuid.uuid4()),) for bet in random_bets(ids, 30, seed=3)]
+    write_journal(tmp_path / "bets-1-1.journal", bets)
+    # a torn half record at the end was never acknowledged and is dropped
+    with open(tmp_path / "bets-1-1.journal", "ab") as f:
+        f.write(encode(bets[0], 0)[:RECORD.size // 2])
+
+    writer = JournalWriter(tmp_path)
+    assert writer.recover() == len(bets)
+    assert list(tmp_path.glob("bets-*.journal")) == []
+
+    # the same records again, e.g. a journal that was partly projected before a crash
+    write_journal(tmp_path / "bets-2-2.journal", bets)
+    assert writer.recover() == 0
+    with SessionLocal() as db:
+        assert ledger.verify(db) == {}
+
+
+def test_rejected_record_is_quarantined_not_retried(ids, tmp_path):
+    with SessionLocal() as db:
+        ledger.load(db)
+    bets = [bet + (str(uuid.uuid4()),) for bet in random_bets(ids, 10, seed=4)]
+    # past check() in an older build, but rejected by the DB
+    bad = ("win", ids["players"][0], -5.0, "tester@bwater.com", None, str(uuid.uuid4()))
+    write_journal(tmp_path / "bets-3-3.journal", bets[:5] + [bad] + bets[5:])
+
+    writer = JournalWriter(tmp_path)
+    assert writer.recover() == len(bets)
+    quarantined = read_journal(tmp_path / "quarantine-3-3.journal").records
+    assert [bet for bet, _ in quarantined] == [bad]
+    assert list(tmp_path.glob("bets-*.journal")) == []
+    with SessionLocal() as db:
+        assert ledger.verify(db) == {}
@@ -0,0 +1,79 @@
+"""The in-memory pool ledger against the SQL odds (app/odds.py)."""
+
+import random
+from app.models import SessionLocal, AdvanceBet, WinBet, PropBet
+from app.odds import pool_odds, prop_odds
+from app.ledger import ledger, PoolLedger, MARKETS, _same
+from app.writer import bet_writer
+
+
+def sql_odds(db):
+    return {
+        "advance": pool_odds(db, AdvanceBet, AdvanceBet.player_id),
+        "win":     pool_odds(db, WinBet, WinBet.player_id),
+        "prop":    pool_odds(db, PropBet, PropBet.prop_id),
+    }
+
+
+def random_bets(ids, n, seed):
+    rnd = random.Random(seed)
+    for i in range(n):
+        market = MARKETS[i % len(MARKETS)]
+        target = rnd.choice(ids["props"] if market == "prop" else ids["players"])
+        side = rnd.random() < 0.5 if market == "prop" else None
+        yield market, target, round(rnd.uniform(1, 250), 2), rnd.choice(ids["emails"]), side
+
+
+def test_ledger_odds_match_sql(ids):
+    with SessionLocal() as db:
+        ledger.load(db)
+    for bet in random_bets(ids, 60, seed=1):
+        bet_writer.place(*bet)
+    with SessionLocal() as db:
+        expected, sides = sql_odds(db), prop_odds(db)
+        assert ledger.verify(db) == {}
+    for market in MARKETS:
+        assert _same(ledger.pool_odds(market), expected[market])
+    assert _same(ledger.prop_odds(), sides)
+
+
+def test_second_ledger_syncs_bets_from_another_worker(ids):
+    # `other` stands in for a second worker: it never sees the record() calls
+    other = PoolLedger(sync_seconds=0)
+    with SessionLocal() as db:
+        other.load(db)
+    for bet in random_bets(ids, 60, seed=2):
+        bet_writer.place(*bet)
+    with SessionLocal() as db:
+        assert other.verify(db) != {}
+        other.sync(db)
+        assert other.verify(db) == {}
+        expected = sql_odds(db)
+    for market in MARKETS:
+        assert _same(other.pool_odds(market), expected[market])
+
+
+def test_tag_is_shared_by_workers_with_the_same_bets(ids):
+    # syncing on, as with several workers; neither ledger sees bet_writer's record() calls
+    a, b = PoolLedger(sync_seconds=3600), PoolLedger(sync_seconds=3600)
+    with SessionLocal() as db:
+        a.load(db)
+    for bet in random_bets(ids, 6, seed=5):
+        bet_writer.place(*bet)
+    with SessionLocal() as db:
+        b.load(db)
+    assert a.tag("win") != b.tag("win")
+    with SessionLocal() as db:
+        a.sync(db)
+    assert a.tag("win") == b.tag("win")
+
+    # a bet `a` commits and records itself moves its tag to where `b` lands on sync
+    with a.commit_lock, SessionLocal() as db:
+        row = WinBet(player_id=ids["players"][0], amount=5.0, bettor_email="tester@bwater.com")
+        db.add(row)
+        db.commit()
+        a.record("win", row.player_id, row.amount, None, row.bet_id)
+    with SessionLocal() as db:
+        b.sync(db)
+    assert a.tag("win") == b.tag("win")
+    assert a.pool_odds("win") == b.pool_odds("win")
@@ -0,0 +1,18 @@
+"""Quantiles of the Monte Carlo payout totals, read from per-amount counts."""
+
+import numpy as np
+import pytest
+from app.montecarlo import _count, _percentile
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 1000])
+def test_percentile_from_counts_matches_numpy(n):
+    totals = np.random.default_rng(n).integers(240_000_000, 240_000_050, n)
+    cents = {}
+    for block in np.array_split(totals, 4):
+        _count(cents, *np.unique(block, return_counts=True))
+    values = np.array(sorted(cents), dtype=np.int64)
+    counts = np.array([cents[v] for v in values.tolist()])
+    assert counts.sum() == n
+    for q in (0, 5, 50, 95, 100):
+        assert _percentile(values, counts, q) == pytest.approx(np.percentile(totals, q))
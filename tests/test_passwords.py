@@ -0,0 +1,19 @@
+"""The password pool's slot accounting."""
+
+import time
+import pytest
+from app.passwords import PasswordPool, HashBusy
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes():
+    pool = PasswordPool(workers=2, queue=1, timeout=0.2, nice=0)
+    try:
+        pool._call(time.sleep, 0)                   # start the workers
+        with pytest.raises(HashBusy):
+            pool._call(time.sleep, 1.5)
+        with pytest.raises(HashBusy):               # a worker is free, but the slot is not
+            pool._call(time.sleep, 0)
+        time.sleep(1.5)
+        assert pool._call(time.sleep, 0) is None
+    finally:
+        pool.close()
@@ -0,0 +1,37 @@
+"""Batched prop settlement (app/payouts.py) against settling each prop on its own."""
+
+import random
+from sqlalchemy import select, func
+from app.models import SessionLocal, PropBet
+from app.payouts import calculate_prop_payouts, HOUSE_TAKE
+
+
+def per_prop(session, prop_results):
+    """Three queries per prop: the implementation calculate_prop_payouts replaced."""
+    payouts = {}
+    for prop_id, yes_won in prop_results.items():
+        total_pool = session.scalar(
+            select(func.sum(PropBet.amount)).where(PropBet.prop_id == prop_id)) or 0.0
+        winning_stake = session.scalar(
+            select(func.sum(PropBet.amount))
+            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)) or 0.0
+        if total_pool <= 0 or winning_stake <= 0:
+            continue
+        for email, amount in session.execute(
+            select(PropBet.bettor_email, PropBet.amount)
+            .where(PropBet.prop_id == prop_id, PropBet.side_yes == yes_won)
+        ):
+            payout = (amount / winning_stake) * (total_pool * (1.0 - HOUSE_TAKE))
+            payouts[email] = payouts.get(email, 0.0) + payout
+    return {email: round(amount, 2) for email, amount in payouts.items()}
+
+
+def test_prop_payouts_match_per_prop_settlement_to_the_cent(ids):
+    rnd = random.Random(7)
+    props = rnd.sample(ids["props"], len(ids["props"]))
+    # a prop nobody bet on settles to nothing, like any other
+    results = {p: rnd.random() < 0.5 for p in props} | {"no-such-prop": True}
+    with SessionLocal() as db:
+        expected = per_prop(db, results)
+        assert expected
+        assert calculate_prop_payouts(db, results) == expected
@@ -0,0 +1,8 @@
+"""Query plans of the bet-table hot paths; see scripts/check_query_plans.py."""
+
+from scripts import check_query_plans
+
+
+def test_hot_paths_use_the_covering_indexes(capsys):
+    failed = check_query_plans.main(["--bets", "500"])
+    assert failed == 0, capsys.readouterr().out
@@ -0,0 +1,34 @@
+"""app.settlement against the app.payouts functions it replaces."""
+
+import random
+from app.models import SessionLocal
+from app.payouts import calculate_all_payouts, get_payout_summary
+from app.settlement import settle
+
+
+def results_for(ids, seed):
+    rnd = random.Random(seed)
+    return {
+        "advance_winners": rnd.sample(ids["players"], 20),
+        "win_winner": rnd.choice(ids["players"]),
+        "prop_results": {p: rnd.random() < 0.5 for p in ids["props"]},
+    }
+
+
+def test_settle_matches_payouts_to_the_cent(ids):
+    results = results_for(ids, seed=11)
+    with SessionLocal() as db:
+        payouts, summary = settle(db, results)
+        assert payouts == calculate_all_payouts(db, results)
+        assert summary == get_payout_summary(db, results)
+    assert payouts
+
+
+def test_settle_partial_results(ids):
+    results = {"win_winner": ids["players"][1]}
+    with SessionLocal() as db:
+        payouts, summary = settle(db, results)
+        assert payouts == calculate_all_payouts(db, results)
+        assert summary == get_payout_summary(db, results)
+    assert list(summary["market_breakdown"]) == ["win"]
+